@@ -0,0 +1,112 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import time
+
+from shapely.geometry import box
+
+from fleury_random import create_edges_from_points, generate_random_3d_points
+from gridpath import Euler, Line
+from programming import generate_hex_grid, process_and_output_edges
+
+
+# 六边形填充图: 矩形边长取 sizes 中的值, 六边形边长为 1
+def hex_segments(size, hex_size=1):
+    rect = box(0, 0, size, size)
+    # process_and_output_edges 会逐条打印边, 计时时屏蔽输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        edges = process_and_output_edges(generate_hex_grid(rect, hex_size), rect)
+    return [((x0, y0, 0), (x1, y1, 0)) for (x0, y0), (x1, y1) in (edge.coords for edge in edges)]
+
+
+# 随机图: fleury_random 风格的随机点环, 再加入随机弦产生奇点
+def random_segments(size, seed=0):
+    random.seed(seed)
+    points = generate_random_3d_points(size)
+    edges = create_edges_from_points(points)
+    for _ in range(size // 2):
+        p, q = random.sample(points, 2)
+        edges.append((p, q))
+    return edges
+
+
+generators = {'hex': hex_segments, 'random': random_segments}
+
+
+# 按阶段计时跑一遍规划
+def run_pipeline(segments):
+    stages = {}
+
+    def timed(name, func, *args):
+        t = time.perf_counter()
+        result = func(*args)
+        stages[name] = time.perf_counter() - t
+        return result
+
+    euler = Euler()
+    timed('point_indexing', lambda: [euler.addEntity(Line(start=s, end=e)) for s, e in segments])
+    euler.graphWeight = timed('weighting', euler.weightGraph)
+    odd = [i for i in range(euler.pointCount) if euler.pointDegree[i] % 2 == 1]
+    timed('shortest_paths', euler.shortestPaths, odd)
+    # 与 getBestPath 相同的步骤, 拆开以便分别计时匹配和欧拉路径
+    se = next(iter(timed('matching', euler.getStartEndIndex)))
+    pd = list(euler.pointDegree)
+    pd[se[0]] += 1
+    pd[se[1]] += 1
+    oddList = [i for i in range(euler.pointCount) if pd[i] % 2 == 1]
+    pairs = euler.bestMatch[1] if euler.bestMatch is not None and euler.bestMatch[0] == tuple(se) else None
+    if oddList:
+        # 度为 1 的点少于两个时, 匹配在 addEdge 中求解
+        t = time.perf_counter()
+        euler.addEdge(oddList, pairs)
+        stages['matching'] += time.perf_counter() - t
+    path = timed('tour', euler.eulerPath, se[0])
+    entities = timed('reshape', euler.reshapeEntities, path)
+    return {
+        'points': euler.pointCount,
+        'edges': len(euler.edges),
+        'odd': len(odd),
+        'added': euler.addedEdges(),
+        'entities': len(entities),
+        'stages': stages,
+        'total': sum(stages.values()),
+    }
+
+
+# 每得到一条记录就重写结果文件, 中途中断时已完成的记录不会丢失
+def save(filename, results):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Euler 规划各阶段的耗时基准')
+    parser.add_argument('--graphs', nargs='+', choices=list(generators), default=list(generators))
+    # 匹配的代价约为奇点数的三次方, hex 边长 20 (约 350 个奇点) 已需要十几秒, 默认规模到此为止, 整轮约半分钟
+    parser.add_argument('--sizes', nargs='+', type=int, default=[5, 10, 15, 20],
+                        help='hex 为矩形边长, random 为点数的 1/10')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('-o', '--output', default='benchmark.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    for graph in args.graphs:
+        for size in args.sizes:
+            n = size if graph == 'hex' else size * 10
+            t = time.perf_counter()
+            segments = generators[graph](n)
+            generate = time.perf_counter() - t
+            for r in range(args.repeat):
+                record = {'graph': graph, 'size': n, 'repeat': r, 'generate': generate}
+                record.update(run_pipeline(segments))
+                results.append(record)
+                save(args.output, results)
+                print('%-6s %6d  points %7d  edges %7d  odd %6d  total %8.3fs' % (
+                    graph, n, record['points'], record['edges'], record['odd'], record['total']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+# 定点坐标: 浮点坐标按分辨率一次量化为 int64, 之后的比较、去重都在整数上进行,
+# 不再对每个点反复 round 并把浮点元组放进 set
+resolution = 0.01 # 默认分辨率, 与原来的 round(x, 2) 相同
+
+
+def quantize(coords, resolution=resolution):
+    """ 浮点坐标量化为 int64 定点数, 舍入规则与 round() 相同 (四舍六入五取偶)
+
+    乘以 1 / resolution 后恰好落在 .5 上的少数值 (如 2.675 * 100 == 267.5) 按乘积取整,
+    与 round() 按十进制精确值的结果可能差一个单位 """
+    return np.rint(np.asarray(coords, dtype=float) * (1 / resolution)).astype(np.int64)
+
+
+def dequantize(q, resolution=resolution):
+    """ 定点数还原为浮点坐标, 分辨率为 10 的负幂时结果与 round(x, n) 一致 """
+    return np.asarray(q) / (1 / resolution)
+
+
+def canonical_edges(edges):
+    """ 定点边表 (N, 2d) 每行为起点、终点, 交换使起点按字典序不大于终点 """
+    edges = np.asarray(edges, dtype=np.int64)
+    d = edges.shape[1] // 2
+    start, end = edges[:, :d], edges[:, d:]
+    # 从最后一维往前比, 第一处不等的坐标决定顺序
+    swap = np.zeros(len(edges), dtype=bool)
+    for c in range(d - 1, -1, -1):
+        swap = np.where(start[:, c] != end[:, c], start[:, c] > end[:, c], swap)
+    return np.where(swap[:, None], np.concatenate((end, start), axis=1), edges)
+
+
+def unique_edges(edges):
+    """ 去掉退化边 (起点等于终点) 和重复边 (含方向相反的边)
+
+    返回每条保留边首次出现的下标, 按原顺序排列 """
+    edges = canonical_edges(edges)
+    d = edges.shape[1] // 2
+    valid = np.flatnonzero(np.any(edges[:, :d] != edges[:, d:], axis=1))
+    _, first = np.unique(edges[valid], axis=0, return_index=True)
+    return valid[np.sort(first)]
@@ -0,0 +1,117 @@
+import math
+
+from ezdxf.math import ConstructionEllipse
+
+
+class GcodeWriter:
+    """ 把 reshapeEntities 得到的图元流式写成 G 代码
+    直线为 G1, 圆弧按走向为 G2 / G3, 椭圆弧按弦高展开为 G1; 与上一点不相接时先用 G0 空走过去.
+    坐标和进给都是模态的, 与上一行相同的字不再输出; 输出先攒在缓冲区, 满 bufferSize 个字符再整块写入,
+    图元可以逐层或逐个送入, 不必一次持有整个程序 """
+
+    def __init__(self, file, feed=1200, travelFeed=6000, precision=3, bufferSize=1 << 20, tolerance=0.01) -> None:
+        self.owner = isinstance(file, str)
+        self.file = open(file, 'w', encoding='ascii', newline='\n') if self.owner else file
+        self.feed = feed # 加工进给 (mm/min)
+        self.travelFeed = travelFeed # 空走进给
+        self.format = '%.' + str(precision) + 'f'
+        self.bufferSize = bufferSize
+        self.tolerance = tolerance # 椭圆弧展开的弦高, 也是判断两点相接的距离
+        self.position = None # 当前位置 (x, y, z)
+        self.modal = {} # 上一次输出的各个字, 如 {'X': '1.000', 'F': '1200'}
+        self.buffer = []
+        self.buffered = 0
+        self.moves = 0 # 已输出的运动指令数
+        self.emit('G21') # 毫米
+        self.emit('G90') # 绝对坐标
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, entities):
+        """ 依次写入图元, entities 可以是生成器 """
+        for line in self.lines(entities):
+            self.emit(line)
+
+    def lines(self, entities):
+        """ 逐行产出 G 代码, 不包含被合并掉的空行 """
+        for e in entities:
+            if e.dxftype == 'LINE':
+                start, end = tuple(e.start), tuple(e.end)
+                yield from self.travel(start)
+                yield from self.move('G1', end, self.feed)
+            elif e.dxftype == 'ARC':
+                yield from self.arc(e)
+            else:
+                yield from self.ellipse(e)
+
+    def arc(self, e):
+        # 圆弧在 DXF 中绕法向逆时针, 法向朝 -z (镜像) 时在 XY 平面上是顺时针; 从终点一侧进入时反向走
+        start, end = tuple(e.start), tuple(e.end)
+        reverse = self.position is not None and math.dist(self.position, end) < math.dist(self.position, start)
+        if reverse:
+            start, end = end, start
+        yield from self.travel(start)
+        center = e.wcs(e.center)
+        offset = {'I': self.number(center[0]-start[0]), 'J': self.number(center[1]-start[1])}
+        clockwise = reverse != (e.extrusion[2] < 0)
+        yield from self.move('G2' if clockwise else 'G3', end, self.feed, offset)
+
+    def ellipse(self, e):
+        ellipse = ConstructionEllipse(center=e.center, major_axis=e.major_axis, extrusion=e.extrusion, ratio=e.ratio,
+                                      start_param=e.start_param, end_param=e.end_param)
+        points = [tuple(p) for p in ellipse.flattening(self.tolerance)]
+        if self.position is not None and math.dist(self.position, points[-1]) < math.dist(self.position, points[0]):
+            points.reverse()
+        yield from self.travel(points[0])
+        for p in points[1:]:
+            yield from self.move('G1', p, self.feed)
+
+    def travel(self, point):
+        """ 当前位置与 point 不相接时空走过去 """
+        if self.position is None or math.dist(self.position, point) > self.tolerance:
+            yield from self.move('G0', point, self.travelFeed)
+
+    def move(self, code, point, feed, extra=None):
+        words = {'X': self.number(point[0]), 'Y': self.number(point[1]), 'Z': self.number(point[2])}
+        changed = [k + v for k, v in words.items() if self.modal.get(k) != v]
+        self.position = point
+        # 格式化后坐标不变的直线 (零长度) 不输出; 圆弧即使起止相同也是整圆
+        if not changed and extra is None:
+            return
+        self.modal.update(words)
+        fields = [code] + changed + [k + v for k, v in (extra or {}).items()]
+        f = '%g' % feed
+        if self.modal.get('F') != f:
+            self.modal['F'] = f
+            fields.append('F' + f)
+        self.moves += 1
+        yield ' '.join(fields)
+
+    def number(self, value):
+        # 舍入到 0 的负数不输出负号
+        text = self.format % value
+        return text[1:] if text[0] == '-' and float(text) == 0 else text
+
+    def emit(self, line):
+        self.buffer.append(line)
+        self.buffered += len(line) + 1
+        if self.buffered >= self.bufferSize:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.buffer.append('')
+            self.file.write('\n'.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
+    def close(self):
+        self.flush()
+        if self.owner:
+            self.file.close()
+        else:
+            self.file.flush()
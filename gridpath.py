@@ -1,128 +1,600 @@
+import collections
+import functools
+import heapq
+import json
 import math
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 import ezdxf 
 import ezdxf.entities
+from ezdxf.addons import iterdxf
+from ezdxf.math import OCS
 import matplotlib.pyplot as plt
+import networkx as nx
 import numpy as np 
 import cvxpy as cp 
 import sympy
+try:
+    import resource
+except ImportError:
+    # Windows 上没有 resource 模块
+    resource = None
 
 
 
+def processPeakMemory():
+    """ 进程自启动以来的最大常驻内存 (字节), 不能按阶段重置; 没有 resource 模块时为 None """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss*1024
+
+
+def stage(name):
+    """ 把方法记为一个规划阶段, 设置了 Euler.metrics 时在方法结束后发出该阶段的事件,
+    未设置时只多一次属性判断.
+    开启了 tracemalloc 时事件中的 peakMemory 是本阶段 (含内层阶段) 的分配峰值;
+    否则只能给出 processPeakMemory, 即整个进程到此为止的最大常驻内存 """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return func(self, *args, **kwargs)
+            info = {}
+            self.stageInfo.append(info)
+            calls = self.solverCalls
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                # 重置峰值只统计本阶段; 重置前的峰值属于外层阶段, 结束时并入外层
+                before = tracemalloc.get_traced_memory()[1]
+                tracemalloc.reset_peak()
+                self.stagePeaks.append(0)
+            t = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            except Exception as e:
+                info['error'] = '%s: %s' % (type(e).__name__, e)
+                raise
+            finally:
+                self.stageInfo.pop()
+                event = {
+                    'event': 'stage',
+                    'stage': name,
+                    'seconds': time.perf_counter()-t,
+                    'points': self.pointCount,
+                    'edges': len(self.edges),
+                    'solverCalls': self.solverCalls-calls,
+                    'addedEdges': self.addedEdges(),
+                }
+                if tracing:
+                    peak = max(tracemalloc.get_traced_memory()[1], self.stagePeaks.pop())
+                    if self.stagePeaks:
+                        self.stagePeaks[-1] = max(self.stagePeaks[-1], before, peak)
+                    event['peakMemory'] = peak
+                else:
+                    event['processPeakMemory'] = processPeakMemory()
+                event.update(info)
+                self.metrics(event)
+        return wrapper
+    return decorator
+
+
+class MetricsLog:
+    """ 把规划事件逐行写成 JSON, 可直接赋给 Euler.metrics """
+    def __init__(self, file) -> None:
+        self.owner = isinstance(file, str)
+        self.file = open(file, 'a', encoding='utf-8') if self.owner else file
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self.owner:
+            self.file.close()
+
+
+
+# 图元只保存几何参数, 用 __slots__ 不带 __dict__; Euler 中的边存放在列式数组里,
+# 需要时才由 Euler.entity 按列数据生成图元
 class Line:
+    __slots__ = ('start', 'end')
+    dxftype = 'LINE'
+
     def __init__(self, e: ezdxf.entities.Line = None, start=None, end=None) -> None:
-        self.dxftype = 'LINE'
         if e is not None:
-            self.start = e.dxf.start
-            self.end = e.dxf.end
-        else:
-            self.start = tuple(start)
-            self.end = tuple(end)
+            start, end = e.dxf.start, e.dxf.end
+        self.start = tuple(start)
+        self.end = tuple(end)
+
+    @property
+    def length(self):
+        return math.dist(self.start, self.end)
+
+    def params(self):
+        """ 存入 Euler.curveParams 的参数, 直线由端点决定, 没有额外参数 """
+        return ()
 
 class Arc:
-    def __init__(self, e: ezdxf.entities.Arc) -> None: 
-        self.dxftype = 'ARC'
-        self.center = e.dxf.center
-        self.start_angle = e.dxf.start_angle 
-        self.end_angle = e.dxf.end_angle
-        self.radius = e.dxf.radius
-        self.start = e.start_point
-        self.end = e.end_point
-
-    def __init__(self, e: ezdxf.entities.Ellipse) -> None: 
-        self.dxftype = 'ELLIPSE'
-        self.center = e.dxf.center
-        self.major_axis = e.dxf.major_axis 
-        self.ratio = e.dxf.ratio
-        self.start_param = e.dxf.start_param
-        self.end_param = e.dxf.end_param 
-        self.start = e.start_point
-        self.end = e.end_point 
-        self.minor_axis = e.minor_axis
+    # center 与起止角是法向 extrusion 下的 OCS 坐标, 与 DXF 相同; 镜像的圆弧法向为 (0, 0, -1)
+    __slots__ = ('center', 'radius', 'start_angle', 'end_angle', 'extrusion')
+    dxftype = 'ARC'
+
+    def __init__(self, e: ezdxf.entities.Arc = None, center=None, radius=None, start_angle=None, end_angle=None,
+                 extrusion=(0.0, 0.0, 1.0)) -> None: 
+        if e is not None:
+            center, radius, start_angle, end_angle = e.dxf.center, e.dxf.radius, e.dxf.start_angle, e.dxf.end_angle
+            extrusion = e.dxf.extrusion
+        self.center = tuple(center)
+        self.radius = float(radius)
+        self.start_angle = float(start_angle)
+        self.end_angle = float(end_angle)
+        self.extrusion = tuple(extrusion)
+
+    def wcs(self, point):
+        """ OCS 坐标转为 WCS 坐标, 法向为 z 轴时两者相同 """
+        if self.extrusion == (0.0, 0.0, 1.0):
+            return tuple(point)
+        return tuple(OCS(self.extrusion).to_wcs(point))
+
+    def point(self, angle):
+        """ 角度 angle 处的点 (WCS) """
+        a = math.radians(angle)
+        return self.wcs((self.center[0] + self.radius*math.cos(a), self.center[1] + self.radius*math.sin(a), self.center[2]))
+
+    @property
+    def start(self):
+        return self.point(self.start_angle)
+
+    @property
+    def end(self):
+        return self.point(self.end_angle)
+
+    @property
+    def length(self):
+        """ 弧长, 逆时针从起始角到终止角, 两角相同时为整圆 """
+        sweep = (self.end_angle-self.start_angle) % 360
+        if sweep == 0:
+            sweep = 360
+        return self.radius*math.radians(sweep)
+
+    def params(self):
+        return (*self.center, self.radius, self.start_angle, self.end_angle, *self.extrusion)
+
+    @classmethod
+    def fromParams(cls, p):
+        return cls(center=p[:3], radius=p[3], start_angle=p[4], end_angle=p[5], extrusion=p[6:9])
+
+class Ellipse:
+    # center 与长轴是 WCS 坐标, 短轴方向由法向 extrusion 叉乘长轴得到
+    __slots__ = ('center', 'major_axis', 'ratio', 'start_param', 'end_param', 'extrusion')
+    dxftype = 'ELLIPSE'
+
+    def __init__(self, e: ezdxf.entities.Ellipse = None, center=None, major_axis=None, ratio=None,
+                 start_param=None, end_param=None, extrusion=(0.0, 0.0, 1.0)) -> None: 
+        if e is not None:
+            center, major_axis, ratio = e.dxf.center, e.dxf.major_axis, e.dxf.ratio
+            start_param, end_param = e.dxf.start_param, e.dxf.end_param
+            extrusion = e.dxf.extrusion
+        self.center = tuple(center)
+        self.major_axis = tuple(major_axis)
+        self.ratio = float(ratio)
+        self.start_param = float(start_param)
+        self.end_param = float(end_param)
+        self.extrusion = tuple(extrusion)
+
+    @property
+    def minor_axis(self):
+        # 短轴为法向叉乘长轴, 长度为长轴的 ratio 倍; 法向为 z 轴时即长轴逆时针转 90 度
+        n, m = self.extrusion, self.major_axis
+        cross = (n[1]*m[2]-n[2]*m[1], n[2]*m[0]-n[0]*m[2], n[0]*m[1]-n[1]*m[0])
+        scale = self.ratio*math.hypot(*m)/math.hypot(*cross)
+        return tuple(c*scale for c in cross)
+
+    def point(self, param):
+        c, s = math.cos(param), math.sin(param)
+        minor = self.minor_axis
+        return tuple(self.center[k] + self.major_axis[k]*c + minor[k]*s for k in range(3))
+
+    @property
+    def start(self):
+        return self.point(self.start_param)
+
+    @property
+    def end(self):
+        return self.point(self.end_param)
+
+    @property
+    def length(self):
+        """ 椭圆弧长, 没有解析式, 分段 Gauss-Legendre 数值积分 """
+        sweep = (self.end_param-self.start_param) % (2*math.pi)
+        if sweep == 0:
+            sweep = 2*math.pi
+        a = math.hypot(*self.major_axis)
+        b = a*self.ratio
+        x, w = np.polynomial.legendre.leggauss(16)
+        n = 16 # 分段数
+        h = sweep/n
+        t = self.start_param + h*(np.arange(n)[:, None] + (x[None, :]+1)/2)
+        speed = np.sqrt((a*np.sin(t))**2 + (b*np.cos(t))**2)
+        return float(np.sum(speed*w[None, :])*h/2)
+
+    def params(self):
+        return (*self.center, *self.major_axis, self.ratio, self.start_param, self.end_param, *self.extrusion)
+
+    @classmethod
+    def fromParams(cls, p):
+        return cls(center=p[:3], major_axis=p[3:6], ratio=p[6], start_param=p[7], end_param=p[8], extrusion=p[9:12])
+
+# 参与规划的 DXF 图元类型
+dxfTypes = {'LINE': Line, 'ARC': Arc, 'ELLIPSE': Ellipse}
+# 图元类型编号, 下标即 Euler.edgeType 中的值
+entityTypes = (Line, Arc, Ellipse)
+typeCodes = {cls.dxftype: code for code, cls in enumerate(entityTypes)}
+curveWidth = 12 # curveParams 的列数, 取各类图元参数个数的最大值
+
+
+def grow(array, size):
+    """ 容量不足 size 时按倍数扩容, 返回新数组 (前面的数据不变) """
+    if len(array) >= size:
+        return array
+    bigger = np.zeros((max(size, 2*len(array)),) + array.shape[1:], dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
 
 class Euler:
     def __init__(self) -> None: 
-        self.pointList = []
+        # 列式存储, 数组按倍数扩容, 前 pointCount / edgeCount 行有效
+        self.points = np.zeros((0, 3)) # 点坐标
+        self.degree = np.zeros(0, dtype=np.int64) # 点的度
         self.pointCount = 0 
-        self.pointDegree = [] 
-        self.edges = []
-        self.graph = None 
-        self.graphWeight = None 
-        self.edgeDouble = [] 
-        self.floydPath = None
+        self.edgeEnds = np.zeros((0, 2), dtype=np.int64) # 每条边的端点索引, 下标即边的编号
+        self.edgeType = np.zeros(0, dtype=np.int8) # 每条边的图元类型, 见 typeCodes
+        self.edgeCurve = np.zeros(0, dtype=np.int64) # 曲线边在 curveParams 中的行, 直线为 -1
+        self.edgeCount = 0
+        self.curveParams = np.zeros((0, curveWidth)) # 圆弧、椭圆弧的参数, 只有曲线占行
+        self.curveCount = 0
+        self.graph = [] # 稀疏邻接表: graph[i] = {j: 边编号}
+        self.graphWeight = None # 每条边的权重
+        self.distance = {} # 起点 -> 到各点的最短距离
+        self.pathTree = {} # 起点 -> 最短路径上各点的前驱
+        self.pathComplete = set() # 已求出全部可达点的起点
+        self.denseLimit = 300 # 点数不超过该值时直接用矩阵 Floyd
+        self.matcher = 'blossom' # 奇点配对的求解方式: 'blossom' 或 'ilp'
+        self.bestMatch = None # getStartEndIndex 求出的 (起止点, 奇点配对)
+        self.edgeDouble = collections.Counter() # 重边 (u, v) -> 重复次数, 两个方向各记一次
         self.xMax = 0
         self.yMax = 0
         self.inf = 10000 
         self.delta = 1 # 重边偏移量
         self.delta2 = 1 # 立马返回时的延长量
         self.startPoint = None
+        self.tolerance = 0.1 # 判定为同一点的距离
+        self.pointGrid = {} # 空间哈希: 网格坐标 -> 点索引列表, None 表示需要由 points 重建
+        self.metrics = None # 接收各阶段结构化事件 (dict) 的回调, 如 MetricsLog
+        self.stageInfo = [] # 正在进行的阶段补充的字段
+        self.stagePeaks = [] # 正在进行的阶段中已结束的内层阶段带来的内存峰值
+        self.solverCalls = 0 # 匹配求解次数
+
+    @property
+    def pointList(self):
+        """ 点坐标 (pointCount, 3) """
+        return self.points[:self.pointCount]
+
+    @property
+    def pointDegree(self):
+        """ 点的度 (pointCount,), 是 degree 的视图, 可以直接修改 """
+        return self.degree[:self.pointCount]
+
+    @property
+    def edges(self):
+        """ 边的端点索引 (edgeCount, 2) """
+        return self.edgeEnds[:self.edgeCount]
+
+    def entity(self, index):
+        """ 由列数据生成第 index 条边的图元, 直线取合并后的端点坐标 """
+        cls = entityTypes[self.edgeType[index]]
+        if cls is Line:
+            i, j = self.edgeEnds[index].tolist()
+            return Line(start=self.points[i].tolist(), end=self.points[j].tolist())
+        return cls.fromParams(self.curveParams[self.edgeCurve[index]].tolist())
+
+    def gridKey(self, point):
+        """ 点所在的网格坐标, 网格边长等于容差 """
+        t = self.tolerance
+        return (math.floor(point[0]/t), math.floor(point[1]/t), math.floor(point[2]/t))
 
     def getPointIndex(self, point): 
-        for i in range(len(self.pointList)):
-            if self.isSamePoint(self.pointList[i], point):
-                self.pointDegree[i] += 1
-                return i 
-        i = len(self.pointList)
-        self.pointList.append(point) 
-        self.pointDegree.append(1) 
+        # 容差内的点只可能落在相邻的网格中, 取其中最早加入的点, 与逐个比较的结果一致
+        if self.pointGrid is None:
+            self.buildPointGrid()
+        x, y, z = self.gridKey(point)
+        index = -1
+        for i in (x-1, x, x+1):
+            for j in (y-1, y, y+1):
+                for k in (z-1, z, z+1):
+                    for p in self.pointGrid.get((i, j, k), ()):
+                        if (index == -1 or p < index) and self.isSamePoint(self.points[p], point):
+                            index = p
+        if index != -1:
+            self.degree[index] += 1
+            return index
+        i = self.pointCount
+        self.points = grow(self.points, i+1)
+        self.degree = grow(self.degree, i+1)
+        self.points[i] = tuple(point)
+        self.degree[i] = 1
+        self.pointCount = i+1
+        self.pointGrid.setdefault((x, y, z), []).append(i)
         return i
     
 
+    def buildPointGrid(self):
+        """ 由点坐标重建空间哈希; 批量加入点时不逐点维护, 到按坐标查点时才建 """
+        self.pointGrid = {}
+        for i, point in enumerate(self.pointList.tolist()):
+            self.pointGrid.setdefault(self.gridKey(point), []).append(i)
+
+
+    def record(self, **fields):
+        """ 为当前阶段的事件补充字段 """
+        if self.stageInfo:
+            self.stageInfo[-1].update(fields)
+
+
     def isSamePoint(self, p1, p2): 
         for i in range(3):
-            if abs(p1[i]-p2[i]) > 0.1: 
+            if abs(p1[i]-p2[i]) > self.tolerance: 
                 return False  
         return True
 
 
-    def optGraph(self, graph):
-        graph2 = [[None]*self.pointCount for i in range(self.pointCount)] 
-        for i in range(self.pointCount):
-            for j in range(self.pointCount): 
-                graph2[i][j] = graph[i][j]
-        return graph2    
-    
+    def addEntity(self, e):
+        """ 把一个图元作为一条边加入图中, 返回边的编号 """
+        i = self.getPointIndex(e.start)
+        j = self.getPointIndex(e.end)
+        while len(self.graph) < self.pointCount:
+            self.graph.append({})
+        index = self.edgeCount
+        self.edgeEnds = grow(self.edgeEnds, index+1)
+        self.edgeType = grow(self.edgeType, index+1)
+        self.edgeCurve = grow(self.edgeCurve, index+1)
+        self.edgeEnds[index] = (i, j)
+        self.edgeType[index] = typeCodes[e.dxftype]
+        self.edgeCurve[index] = -1
+        params = e.params()
+        if params:
+            self.curveParams = grow(self.curveParams, self.curveCount+1)
+            self.curveParams[self.curveCount, :len(params)] = params
+            self.edgeCurve[index] = self.curveCount
+            self.curveCount += 1
+        self.edgeCount = index+1
+        self.link(i, j, index)
+        return index
+
+
+    def edgeLength(self, index):
+        """ 第 index 条边的权重, 与 weightGraph 的算法相同 """
+        if self.graphWeight is not None and index < len(self.graphWeight):
+            return self.graphWeight[index]
+        if self.edgeType[index] == typeCodes['LINE']:
+            i, j = self.edgeEnds[index].tolist()
+            return math.hypot(self.points[i, 0]-self.points[j, 0], self.points[i, 1]-self.points[j, 1])
+        return self.entity(index).length
+
+
+    def link(self, i, j, index):
+        """ 在邻接表中登记边 index. 两点间有多条边时邻接表只记权重最小的一条,
+        最短路径和重边都走这一条; 其余平行边仍在边表中, 欧拉路径按边编号逐条走到 """
+        old = self.graph[i].get(j)
+        if old is None or self.edgeLength(index) < self.edgeLength(old):
+            self.graph[i][j] = index
+            self.graph[j][i] = index
+
+
+    def addEdgeArrays(self, points, edges):
+        """ 批量加入点表 points (N, 2 或 3) 和边表 edges (E, 2), 如 hexlattice.hex_lattice_graph 的输出
+        点应已去重, 不再做容差合并; 边都是直线段, 直接写入列数组, 不逐条创建 Line """
+        points = np.asarray(points, dtype=float)
+        if len(points) == 0:
+            # 空的层 (如零件尖端只有孤立点) 没有点也没有边
+            points = points.reshape(0, 3)
+        if points.shape[1] == 2:
+            points = np.column_stack((points, np.zeros(len(points))))
+        n, m = self.pointCount, self.edgeCount
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2) + n
+        self.points = grow(self.points, n+len(points))
+        self.degree = grow(self.degree, n+len(points))
+        self.points[n:n+len(points)] = points
+        self.pointCount = n+len(points)
+        self.degree[:self.pointCount] += np.bincount(edges.ravel(), minlength=self.pointCount)
+        self.pointGrid = None
+        self.graph.extend({} for k in range(len(points)))
+        self.edgeEnds = grow(self.edgeEnds, m+len(edges))
+        self.edgeType = grow(self.edgeType, m+len(edges))
+        self.edgeCurve = grow(self.edgeCurve, m+len(edges))
+        self.edgeEnds[m:m+len(edges)] = edges
+        self.edgeType[m:m+len(edges)] = typeCodes['LINE']
+        self.edgeCurve[m:m+len(edges)] = -1
+        self.edgeCount = m+len(edges)
+        for index, (i, j) in enumerate(edges.tolist(), m):
+            if j in self.graph[i]:
+                self.link(i, j, index)
+            else:
+                self.graph[i][j] = index
+                self.graph[j][i] = index
 
+
+    @stage('readDxf')
+    def readDxf(self, filename, streaming=True):
+        """ 把 DXF 模型空间中的 LINE / ARC / ELLIPSE 逐个加入图中
+        streaming 为 True 时用 iterdxf 按图元流式读取, 不把整个文档载入内存 """
+        if streaming:
+            entities = iterdxf.modelspace(filename, types=list(dxfTypes))
+        else:
+            entities = ezdxf.readfile(filename).modelspace().query(' '.join(dxfTypes))
+        for e in entities:
+            self.addEntity(dxfTypes[e.dxftype()](e))
+
+
+    @stage('weightGraph')
     def weightGraph(self):
-        graphWeight = [[-1]*self.pointCount for i in range(self.pointCount)] 
-        for i in range(self.pointCount):
-            for j in range(self.pointCount): 
-                weight = -1 
-                e = self.graph[i][j]
-                if e == None:
-                    continue 
-                if e.dxftype == 'LINE': 
-                    weight = math.sqrt((e.start[0]-e.end[0]) ** 2+(e.start[1]-e.end[1])**2) 
-                else:
-                    weight = self.inf 
-                graphWeight[i][j] = weight
-        return graphWeight
+        """ 每条边的权重, 直线按端点算长度, 圆弧和椭圆弧取弧长 """
+        if self.edgeCount == 0:
+            return np.zeros(0)
+        start = self.points[self.edges[:, 0]]
+        end = self.points[self.edges[:, 1]]
+        weight = np.hypot(start[:, 0]-end[:, 0], start[:, 1]-end[:, 1])
+        for index in np.flatnonzero(self.edgeType[:self.edgeCount] != typeCodes['LINE']):
+            weight[index] = self.entity(index).length
+        return weight
     
 
     def floyd(self):
-        g = self.graphWeight 
-        l = len(g)
-        self.floydPath = [[i for i in range(self.pointCount)] for i in range(self.pointCount)] 
-        for k in range(l):
-            for i in range(l):
-                for j in range(l):
-                    if i == j:
-                        continue 
-                    if g[i][k] != -1 and g[k][j] != -1:
-                        if g[i][j] == -1 or g[i][j] > g[i][k]+g[k][j]:
-                            g[i][j] = g[i][k]+g[k][j]
-                            self.floydPath[i][j] = self.floydPath[i][k]
+        """ 矩阵形式的 Floyd, 一次求出所有点对的最短距离, 适合点数较少的情况 """
+        n = self.pointCount
+        g = np.full((n, n), np.inf)
+        path = np.full((n, n), -1)
+        edges = np.asarray(self.edges).reshape(-1, 2)
+        weight = np.asarray(self.graphWeight, dtype=float)
+        # 两点间有多条边时取最短的一条
+        for u, v in ((0, 1), (1, 0)):
+            order = np.lexsort((-weight, edges[:, v], edges[:, u]))
+            g[edges[order, u], edges[order, v]] = weight[order]
+            path[edges[order, u], edges[order, v]] = edges[order, u]
+        np.fill_diagonal(g, 0)
+        np.fill_diagonal(path, np.arange(n))
+        for k in range(n):
+            alt = g[:, k, None] + g[None, k, :]
+            shorter = alt < g
+            g = np.where(shorter, alt, g)
+            path = np.where(shorter, path[k][None, :], path)
+        for i in range(n):
+            self.distance[i] = g[i]
+            self.pathTree[i] = path[i]
+            self.pathComplete.add(i)
 
 
-    def getCost(self, oddList: list):   
+    def dijkstra(self, source, targets=()):
+        """ 从 source 出发的 Dijkstra, 所有 targets 都确定后即停止 """
+        remaining = set(targets)
+        remaining.discard(source)
+        dist = {source: 0}
+        pred = {source: source}
+        done = set()
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            remaining.discard(u)
+            if targets and not remaining:
+                break
+            for v, index in self.graph[u].items():
+                nd = d + self.graphWeight[index]
+                if v not in dist or nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        else:
+            self.pathComplete.add(source)
+        self.distance[source] = {v: dist[v] for v in done}
+        self.pathTree[source] = {v: pred[v] for v in done}
+
+
+    @stage('shortestPaths')
+    def shortestPaths(self, sources):
+        """ 求出 sources 两两之间的最短路径, 已求过的起点不再重复计算 """
+        if self.graphWeight is None:
+            self.graphWeight = self.weightGraph()
+        if self.pointCount <= self.denseLimit:
+            if len(self.distance) < self.pointCount:
+                self.floyd()
+            return
+        for s in sources:
+            if s in self.pathComplete:
+                continue
+            known = self.distance.get(s)
+            if known is None or any(t not in known for t in sources):
+                self.dijkstra(s, sources)
+
+
+    def getDistance(self, r, c):
+        """ 最短距离, 不可达时为 math.inf """
+        d = self.distance[r]
+        d = d.get(c, math.inf) if isinstance(d, dict) else d[c]
+        return float(d)
+
+
+    def farCost(self, count):
+        """ 不可达或不允许的配对使用的代价
+        大于 count 个点任意配对的实际总代价 (每对不超过全部边长之和), 随零件尺寸变化, 不是固定常数 """
+        total = float(np.sum(self.graphWeight)) if self.graphWeight is not None else 0.0
+        return (total+1)*(count+1)
+
+
+    def getShortestPath(self, r, c) -> list:
+        """ r 到 c 的最短路径经过的点, 两个方向取同一条路径 """
+        if r > c:
+            return self.getShortestPath(c, r)[::-1]
+        pred = self.pathTree[r]
+        path = [c]
+        while path[-1] != r:
+            path.append(int(pred[path[-1]]))
+        path.reverse()
+        return path
+
+
+    def oddGraph(self, oddList: list):
+        """ 奇点之间的最短距离矩阵, 对角线和不可达的点对为 farCost """
+        self.shortestPaths(oddList)
         l = len(oddList)
+        far = self.farCost(l)
         oddGraph = np.zeros((l, l))
         for i in range(l):
             for j in range(l):
                 if i == j:
-                    oddGraph[i][j] = self.inf
-            else:
-                oddGraph[i][j] = self.graphWeight[oddList[i]][oddList[j]]
-        return self.cvx2(oddGraph)
+                    oddGraph[i][j] = far
+                else:
+                    oddGraph[i][j] = min(self.getDistance(oddList[i], oddList[j]), far)
+        return oddGraph
+
+
+    def getCost(self, oddList: list):   
+        return self.match(self.oddGraph(oddList))[1]
+
+
+    def match(self, c):
+        """ 奇点最小权完美匹配, 返回 (配对集合, 最优值), 与 cvx / cvx2 的结果形式相同 """
+        self.solverCalls += 1
+        if self.matcher == 'ilp':
+            edges = self.cvx(c)
+            return edges, sum(c[i][j] for i, j in edges)
+        if self.matcher == 'blossom':
+            return self.blossom(c)
+        raise ValueError('未知的配对方式: %s' % self.matcher)
+
+
+    def blossom(self, c):
+        """ 用带花树算法求最小权完美匹配, 多项式时间, 不需要整数规划求解器 """
+        n = len(c)
+        g = nx.Graph()
+        g.add_nodes_from(range(n))
+        for i in range(n):
+            for j in range(i+1, n):
+                g.add_edge(i, j, weight=float(c[i][j]))
+        edges = set()
+        for i, j in nx.min_weight_matching(g):
+            edges.add((i, j))
+            edges.add((j, i))
+        # 与整数规划一致: 配不上对的点与自身配对
+        matched = {i for i, j in edges}
+        for i in range(n):
+            if i not in matched:
+                edges.add((i, i))
+        return edges, sum(c[i][j] for i, j in edges)
     
 
     def cvx2(self, c):
@@ -162,21 +634,15 @@ class Euler:
     
     def pointClosestToOrigin(self):
         """ 离原点最近的点的索引 """
-        minDis = self.inf
-        index = 0
-        for i in range(self.pointCount):
-            # if self.pointDegree[i] % 2 == 0:
-            # continue
-            p = self.pointList[i]
-            dis = math.sqrt(p[0]**2+p[1]**2)
-            if dis < minDis:
-                minDis = dis
-                index = i
-        return index
+        if self.pointCount == 0:
+            return 0
+        dis = np.hypot(self.pointList[:, 0], self.pointList[:, 1])
+        return int(np.argmin(dis))
 
 
-    def getStartEndIndex(self):
-        """ 所有最优起止点坐标 """
+    @stage('startEnd')
+    def getStartEndIndex(self, allTies=False):
+        """ 最优起止点坐标, allTies 为 True 时返回所有代价并列最优的起止点 """
         # 找出所有度为 1 的点
         singlePointList = []
         evenPointList = []
@@ -190,99 +656,170 @@ class Euler:
                 oddPointList.append(i)
             else:
                 evenPointList.append(i)
-        print('度为奇数的点有', oddDegreeCount, '个')
         # 枚举所有可能的起止点组合
         n = len(singlePointList)
-        print('度为 1 的点有', n, '个')
+        self.record(odd=oddDegreeCount, single=n)
         if n == 0 or n == 1:
-            print('度为 1 的点少于两个, 自动选择起止点')
-            i = self.pointClosestToOrigin()
-            seList = []
-            seList.append((i, i))
-            for i in oddPointList:
-                for j in oddPointList:
-                    # if i != j:
-                    seList.append((i, j))
-            for i in evenPointList:
-                seList.append((i, i))
-            seSet = set(seList)
-            for i in range(len(self.pointList)):
-                for j in range(len(self.pointList)):
-                    if (i, j) not in seSet:
-                        seList.append((i, j))
-            return seList
-        seList = []
-        for i in range(n):
-            for j in range(i+1, n):
-                seList.append((singlePointList[i], singlePointList[j]))
-        # 计算每种起止点组合的加边代价
-        costList = []
-        for se in seList:
-            pd = list(self.pointDegree)
-            pd[se[0]] = 2
-            pd[se[1]] = 2
-            oddListTemp = []
-            for i in range(self.pointCount):
-                if pd[i] % 2 == 1:
-                    oddListTemp.append(i)
-            costList.append(round(self.getCost(oddListTemp))/2)
-        minCost = min(costList)
-        print('加边最小代价：', minCost)
-        seListBest = []
-        for i in range(len(seList)):
-            # print('起始点：', seList[i])
-            # print('cost: ', costList[i])
-            if costList[i] == minCost:
-                seListBest.append(seList[i])
-        return seListBest
-    
+            # 度为 1 的点少于两个, 自动选择起止点
+            self.record(auto=True)
+            return self.candidateStartEnd(oddPointList, evenPointList)
+        if not allTies:
+            return self.matchStartEnd(oddPointList)
+        return self.tiedStartEnd(oddPointList)
 
-    def addEdge(self, oddList):
-        l = len(oddList)
-        oddGraph = np.zeros((l, l)) # [[0]*l for i in range(l)]
-        for i in range(l):
-            for j in range(l):
-                if i == j:
-                    oddGraph[i][j] = self.inf
-                else:
-                    oddGraph[i][j] = self.graphWeight[oddList[i]][oddList[j]]
-        edgeSet = self.cvx(oddGraph)
-        pointSet = set()
-        for edgeIndex in edgeSet:
-            # if row_ind[i] > col_ind[i]:
-            # continue
-            edge = (oddList[edgeIndex[0]], oddList[edgeIndex[1]])
-            pointSet.add(edge[0])
-            pointSet.add(edge[1])
-            # print(edge)
-            if edge in self.edges:
-                self.edgeDouble.append(edge)
+
+    def candidateStartEnd(self, oddPointList, evenPointList):
+        """ 度为 1 的点少于两个时依次尝试的起止点, 按需生成, 不一次列出所有点对 """
+        i = self.pointClosestToOrigin()
+        seSet = set()
+        seSet.add((i, i))
+        yield (i, i)
+        for i in oddPointList:
+            for j in oddPointList:
+                if (i, j) not in seSet:
+                    seSet.add((i, j))
+                    yield (i, j)
+        for i in evenPointList:
+            if (i, i) not in seSet:
+                seSet.add((i, i))
+                yield (i, i)
+        for i in range(len(self.pointList)):
+            for j in range(len(self.pointList)):
+                if (i, j) not in seSet:
+                    yield (i, j)
+
+
+    def matchStartEnd(self, oddPointList):
+        """ 一次匹配选出最优起止点
+        加入两个虚拟点, 它们与度为 1 的点配对代价为 0, 与其他点不能配对,
+        与虚拟点配上对的两个度为 1 的点即为起止点, 其余配对就是加边方案 """
+        se, pairs, value = self.solveStartEnd(self.oddGraph(oddPointList), oddPointList)
+        self.record(cost=round(value)/2)
+        self.bestMatch = (se, pairs)
+        return [se]
+
+
+    def solveStartEnd(self, c, oddPointList, forced=(), excluded=()):
+        """ matchStartEnd 的一次求解, c 为奇点距离矩阵
+        forced 中的点 (至多两个) 必须作起止点, excluded 中的点不能作起止点;
+        返回 (起止点, 奇点配对, 最优值), 约束下没有可行解时返回 None """
+        k = len(oddPointList)
+        big = self.farCost(k+2)
+        augmented = np.full((k+2, k+2), float(big))
+        augmented[:k, :k] = c
+        position = {p: i for i, p in enumerate(oddPointList)}
+        forced = [position[p] for p in forced]
+        single = [i for i in range(k) if self.pointDegree[oddPointList[i]] == 1
+                  and oddPointList[i] not in excluded and i not in forced]
+        if len(forced) + len(single) < 2:
+            return None
+        for n, v in enumerate((k, k+1)):
+            allowed = [forced[n]] if n < len(forced) else single
+            augmented[v, allowed] = 0
+            augmented[allowed, v] = 0
+        edgeSet, value = self.match(augmented)
+        if value >= big:
+            # 用到了不允许的配对
+            return None
+        se = tuple(sorted(oddPointList[i] for i, j in edgeSet if i < k and j >= k))
+        pairs = [(oddPointList[i], oddPointList[j]) for i, j in edgeSet if i < k and j < k]
+        return se, pairs, value
+
+
+    def tiedStartEnd(self, oddPointList):
+        """ 所有加边代价并列最优的起止点, 按点索引排序
+        先求一次最优解 (a, b), 再把其余起止点划分成互不重叠的两个子问题: a 不作起止点;
+        a 必须作起止点而 b 不作. 子问题的最优值仍并列最优时记下其解并继续划分, 否则整个子问题都不必再看.
+        求解次数不超过 2*并列数+1, 不必对每一对度为 1 的点各求一次 """
+        c = self.oddGraph(oddPointList)
+        first = self.solveStartEnd(c, oddPointList)
+        best = round(first[2])/2
+        self.record(cost=best)
+        self.bestMatch = first[:2]
+        ties = []
+        stack = [((), (), first)]
+        while stack:
+            forced, excluded, solution = stack.pop()
+            if solution is None:
+                solution = self.solveStartEnd(c, oddPointList, forced, excluded)
+                if solution is None or round(solution[2])/2 != best:
+                    continue
+            se = solution[0]
+            ties.append(se)
+            free = [p for p in se if p not in forced]
+            for n in range(len(free)):
+                stack.append((forced + tuple(free[:n]), excluded + (free[n],), None))
+        self.record(ties=len(ties))
+        return sorted(ties)
+
+
+    @stage('addEdge')
+    def addEdge(self, oddList, pairs=None):
+        """ 为奇点配对加重边, pairs 为已求出的配对 (点索引) 时不再重新求解 """
+        self.record(odd=len(oddList))
+        if pairs is None:
+            edgeSet = self.match(self.oddGraph(oddList))[0]
+            pairs = [(oddList[i], oddList[j]) for i, j in edgeSet]
+        for edge in pairs:
+            # 配对的代价是最短路径长度, 重边也要沿最短路径加; 直接边只在它本身就是最短路径时才用
+            index = self.graph[edge[0]].get(edge[1])
+            if index is not None and self.graphWeight[index] <= self.getDistance(edge[0], edge[1]):
+                path = list(edge)
             else:
-                r = edge[0]
-                c = edge[1]
-                temp = self.floydPath[r][c]
-                self.edgeDouble.append((r, temp))
-                while temp != c:
-                    temp2 = temp
-                    temp = self.floydPath[temp][c]
-                    self.edgeDouble.append((temp2, temp))
+                path = self.getShortestPath(edge[0], edge[1])
+            for k in range(len(path)-1):
+                self.edgeDouble[(path[k], path[k+1])] += 1
             #print('edgeDouble size: ', len(edgeDouble))
-        for edge in self.edgeDouble:
-            if (edge[1], edge[0]) not in self.edgeDouble:
-                print('非对称解')
+        for u, v in self.edgeDouble:
+            if (v, u) not in self.edgeDouble:
                 raise Exception('非对称解')
 
-        def dfs(self, graphCopy, start, path: list):
-            for i in range(len(graphCopy[start])):
-                #i = len(graphCopy[start])-1-i
-                if graphCopy[start][i] is not None:
-                    graphCopy[start][i] = None
-                    if (start, i) not in self.edgeDouble:
-                        graphCopy[i][start] = None
-                    self.dfs(graphCopy, i, path)
-                    path.append((start, i))
-            #print((start, i))
 
+    def addedEdges(self):
+        """ 加入的重边条数, 每条重边在 edgeDouble 中两个方向各记一次 """
+        return sum(self.edgeDouble.values())//2
+
+
+    @stage('eulerPath')
+    def eulerPath(self, start):
+        """ 迭代的 Hierholzer 算法求欧拉路径, O(E), 返回 [(起点, 终点, 边编号)]
+        原有的边和 edgeDouble 中的重边都逐条各走一次, 平行边也各自保留编号; 有边走不到时返回 None """
+        ends = [tuple(e) for e in self.edges.tolist()]
+        ids = list(range(len(ends))) # 每次经过对应的边编号, 重边取邻接表中的那条边
+        for (u, v), n in self.edgeDouble.items():
+            # 每条重边在 edgeDouble 中两个方向各记一次
+            if u < v:
+                ends.extend([(u, v)]*n)
+                ids.extend([self.graph[u][v]]*n)
+        adjacency = [[] for i in range(self.pointCount)]
+        for index, (u, v) in enumerate(ends):
+            adjacency[u].append((v, index))
+            adjacency[v].append((u, index))
+        used = bytearray(len(ends))
+        pointer = [0]*self.pointCount
+        stack = [(start, None, None)] # (当前点, 来自的点, 经过的边)
+        path = []
+        while stack:
+            u = stack[-1][0]
+            row = adjacency[u]
+            p = pointer[u]
+            while p < len(row) and used[row[p][1]]:
+                p += 1
+            pointer[u] = p
+            if p == len(row):
+                v, prev, index = stack.pop()
+                if prev is not None:
+                    path.append((prev, v, ids[index]))
+            else:
+                v, index = row[p]
+                used[index] = 1
+                stack.append((v, u, index))
+        if len(path) != len(ends):
+            return None
+        path.reverse()
+        return path
+
+    @stage('bestPath')
     def getBestPath(self, seListBest):
         for se in seListBest:
             oddList = []
@@ -297,26 +834,130 @@ class Euler:
                 if pd[i] % 2 == 1:
                     oddList.append(i)
             self.edgeDouble.clear()
-            if len(oddList) != 0:
+            if self.bestMatch is not None and self.bestMatch[0] == tuple(se):
+                self.addEdge(oddList, self.bestMatch[1])
+            elif len(oddList) != 0:
                 self.addEdge(oddList)
-            path = []
-            graphCopy = self.optGraph(self.graph)
-            # graphCopy[startPointIndex][endPointIndex] = e
-            # graphCopy[endPointIndex][startPointIndex] = e
-            self.dfs(graphCopy, startPointIndex, path)
-            rightPath = True
-            for i in range(len(path)-1):
-                if path[i][0] != path[i+1][1]:
-                    rightPath = False
-                    break
-            if rightPath:
-                self.startPoint = self.pointList[se[0]]
-                print('起点坐标：', self.pointList[se[0]])
-                print('终点坐标：', self.pointList[se[1]])
-                print('需要加', len(self.edgeDouble)/2, '条边')
-                path.reverse()
+            path = self.eulerPath(startPointIndex)
+            if path is not None:
+                self.startPoint = tuple(self.pointList[se[0]].tolist())
+                self.record(start=[float(x) for x in self.pointList[se[0]]],
+                            end=[float(x) for x in self.pointList[se[1]]])
                 return path
         raise Exception("规划路径失败，请重新指定起点终点!")
+
+
+    def components(self):
+        """ 连通分量, 返回 (每个分量的点索引列表, 每个分量的边编号列表) """
+        label = [-1]*self.pointCount
+        points = []
+        for i in range(self.pointCount):
+            if label[i] != -1:
+                continue
+            c = len(points)
+            label[i] = c
+            stack = [i]
+            members = []
+            while stack:
+                u = stack.pop()
+                members.append(u)
+                for v in self.graph[u]:
+                    if label[v] == -1:
+                        label[v] = c
+                        stack.append(v)
+            members.sort()
+            points.append(members)
+        edges = [[] for c in points]
+        for index, (u, v) in enumerate(self.edges.tolist()):
+            edges[label[u]].append(index)
+        return points, edges
+
+
+    def subgraph(self, points, edgeIds):
+        """ 由部分点和边构成的新 Euler, 规划参数与当前相同 """
+        sub = Euler()
+        sub.tolerance = self.tolerance
+        sub.inf = self.inf
+        sub.delta = self.delta
+        sub.delta2 = self.delta2
+        sub.denseLimit = self.denseLimit
+        sub.matcher = self.matcher
+        # 列数组按下标整体取出, 容量正好等于点数和边数
+        points = np.asarray(points, dtype=np.int64)
+        edgeIds = np.asarray(edgeIds, dtype=np.int64)
+        local = np.full(self.pointCount, -1, dtype=np.int64)
+        local[points] = np.arange(len(points))
+        sub.points = self.points[points]
+        sub.degree = self.degree[points]
+        sub.pointCount = len(points)
+        sub.pointGrid = None
+        sub.graph = [{} for k in range(sub.pointCount)]
+        sub.edgeEnds = local[self.edgeEnds[edgeIds]]
+        sub.edgeType = self.edgeType[edgeIds]
+        curve = self.edgeCurve[edgeIds]
+        isCurve = curve >= 0
+        sub.curveParams = self.curveParams[curve[isCurve]]
+        sub.curveCount = len(sub.curveParams)
+        sub.edgeCurve = np.full(len(edgeIds), -1, dtype=np.int64)
+        sub.edgeCurve[isCurve] = np.arange(sub.curveCount)
+        sub.edgeCount = len(edgeIds)
+        if self.graphWeight is not None:
+            sub.graphWeight = np.asarray(self.graphWeight)[edgeIds]
+        for k, (i, j) in enumerate(sub.edgeEnds.tolist()):
+            sub.link(i, j, k)
+        return sub
+
+
+    @stage('plan')
+    def plan(self, workers=None):
+        """ 按连通分量分别规划, 返回整张图的路径
+        分量多于一个时用进程池并行规划 (workers 为 1 时串行),
+        再从原点出发, 每次接上空走距离最短的分量, 必要时反向走 """
+        points, edges = self.components()
+        self.record(components=len(points))
+        if len(points) == 1 and edges[0]:
+            return self.getBestPath(self.getStartEndIndex())
+        # 没有边的分量 (孤立点) 不需要走, 也不参与衔接
+        keep = [c for c in range(len(points)) if edges[c]]
+        points = [points[c] for c in keep]
+        edges = [edges[c] for c in keep]
+        if len(points) == 0:
+            return []
+        subs = [self.subgraph(points[c], edges[c]) for c in range(len(points))]
+        collect = self.metrics is not None
+        if workers == 1:
+            results = [planComponent(sub, collect) for sub in subs]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(functools.partial(planComponent, collect=collect), subs,
+                                        chunksize=max(1, len(subs)//64)))
+        tours = []
+        for c in range(len(points)):
+            path, edgeDouble, events = results[c]
+            for event in events:
+                event['component'] = c
+                self.metrics(event)
+            g, ids = points[c], edges[c]
+            tours.append(([(g[u], g[v], ids[k]) for u, v, k in path], {(g[u], g[v]): n for (u, v), n in edgeDouble.items()}))
+        ends = np.array([[tuple(self.pointList[t[0][0][0]])[:2], tuple(self.pointList[t[0][-1][1]])[:2]] for t in tours], dtype=float)
+        remaining = np.ones(len(tours), dtype=bool)
+        current = np.zeros(2)
+        fullPath = []
+        self.edgeDouble.clear()
+        for k in range(len(tours)):
+            dis = np.hypot(*(ends-current).transpose(2, 0, 1))
+            dis[~remaining] = np.inf
+            c, side = np.unravel_index(np.argmin(dis), dis.shape)
+            remaining[c] = False
+            path, edgeDouble = tours[c]
+            if side == 1:
+                # 从终点进入, 整条路径反向
+                path = [(v, u, k) for u, v, k in reversed(path)]
+            current = ends[c][1-side]
+            fullPath.extend(path)
+            self.edgeDouble.update(edgeDouble)
+        self.startPoint = tuple(self.pointList[fullPath[0][0]].tolist())
+        return fullPath
     
 
     def move(self, start, end, direction: bool):
@@ -345,8 +986,25 @@ class Euler:
             end[0] += d*math.cos(theta)
             end[1] += d*math.sin(theta)
         return start, end    
+
+    def shift(self, entity, direction: bool):
+        """ 重边的曲线移位, 与 move 对直线的处理相同: 第一次出现向外偏 delta/2, 第二次向内偏 delta/2
+        圆弧改半径; 椭圆弧的等距线不是椭圆, 两个半轴各加减 delta/2, 在长短轴端点处偏移恰为 delta/2 """
+        d = self.delta/2 if direction else -self.delta/2
+        if entity.dxftype == 'ARC':
+            # 半径小于 delta 时向内只偏到半径的一半
+            d = max(d, -entity.radius/2)
+            return Arc(center=entity.center, radius=entity.radius+d, start_angle=entity.start_angle,
+                       end_angle=entity.end_angle, extrusion=entity.extrusion)
+        a = math.hypot(*entity.major_axis)
+        b = a*entity.ratio
+        d = max(d, -b/2)
+        return Ellipse(center=entity.center, major_axis=tuple(c*(a+d)/a for c in entity.major_axis),
+                       ratio=(b+d)/(a+d), start_param=entity.start_param, end_param=entity.end_param,
+                       extrusion=entity.extrusion)
     
 
+    @stage('reshape')
     def reshapeEntities(self, path: list) -> list:
         drawed = set()
         entityList = []
@@ -373,11 +1031,12 @@ class Euler:
         i = 0
         # for edge in path:
         while i < len(path):
-            edge = path[i]
-            e = self.graph[edge[0]][edge[1]]
-            if e.dxftype == 'LINE':
-                start = list(self.pointList[edge[0]])
-                end = list(self.pointList[edge[1]])
+            # 按路径中的边编号取图元, 两点间的平行边各自还原
+            edge = path[i][:2]
+            index = path[i][2]
+            if self.edgeType[index] == typeCodes['LINE']:
+                start = self.points[edge[0]].tolist()
+                end = self.points[edge[1]].tolist()
                 """ if edge not in drawed:
                     drawed.add(edge)
                     drawed.add((edge[1], edge[0]))
@@ -447,12 +1106,49 @@ class Euler:
                     # 不是重边，直接加入
                     e = Line(start=start, end=end)
                     entityList.append(e)
+            elif edge in self.edgeDouble and index == self.graph[edge[0]][edge[1]]:
+                # 重复的曲线: 与直线一样两次分别往两侧移位, 首尾用短直线接回原来的端点
+                # (平行边中只有 graph 里最短的那条会被重复)
+                e = self.entity(index)
+                shifted = self.shift(e, edge not in drawed)
+                drawed.add(edge)
+                drawed.add((edge[1], edge[0]))
+                start = self.points[edge[0]].tolist()
+                end = self.points[edge[1]].tolist()
+                start1, end1 = shifted.start, shifted.end
+                if math.dist(start, e.start) > math.dist(start, e.end):
+                    # 曲线图元的方向与走向相反
+                    start1, end1 = end1, start1
+                entityList.extend([Line(start=start, end=start1), shifted, Line(start=end1, end=end)])
             else:
                 # 不是直线，直接加入
-                entityList.append(e)
+                entityList.append(self.entity(index))
             i += 1
+        self.record(entities=len(entityList))
         return entityList     
 
 
+def planComponent(euler: Euler, collect=False):
+    """ 规划单个连通分量, 返回 (路径, 重边, 事件), 供进程池调用
+    collect 为 True 时收集各阶段的事件, 交给主进程统一发出 """
+    events = []
+    if collect:
+        euler.metrics = events.append
+    path = euler.getBestPath(euler.getStartEndIndex())
+    return path, euler.edgeDouble, events
 
 
+def saveDxf(entities, filename):
+    """ 把 reshapeEntities 得到的图元按顺序写入新的 DXF 文件 """
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for e in entities:
+        if e.dxftype == 'LINE':
+            msp.add_line(e.start, e.end)
+        elif e.dxftype == 'ARC':
+            # 圆心是 OCS 坐标, 必须连同法向写出, 镜像的圆弧才能留在原位
+            msp.add_arc(e.center, e.radius, e.start_angle, e.end_angle, dxfattribs={'extrusion': e.extrusion})
+        else:
+            msp.add_ellipse(e.center, e.major_axis, e.ratio, e.start_param, e.end_param,
+                            dxfattribs={'extrusion': e.extrusion})
+    doc.saveas(filename)
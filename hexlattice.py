@@ -0,0 +1,186 @@
+import ezdxf
+from ezdxf import path
+import numpy as np
+import shapely
+
+import fixedpoint
+from fixedpoint import dequantize, quantize, unique_edges
+
+
+# 矩形区域内的六边形填充图, 不经过 shapely, 直接由格点坐标算出
+#
+# 六边形为平顶, 边长 hex_size, 第 k 列格子中心为 (1.5 * hex_size * k, sqrt(3) * hex_size * m),
+# 奇数列再上移半格, 以矩形左下角为原点. 以 u = hex_size / 2, h = sqrt(3) / 2 * hex_size 为单位,
+# 所有格点都是整数坐标 (a, b): 中心为 (3k, 2m + k % 2), 六个顶点为
+# (a+2, b), (a+1, b+1), (a-1, b+1), (a-2, b), (a-1, b-1), (a+1, b-1).
+# 每个格子只生成上边、右上边、右下边三条边, 整个格栅中每条边恰好生成一次.
+def hex_lattice_edges(nx, ny, k0=0, m0=0):
+    """ 第 k0..k0+nx-1 列, 第 m0..m0+ny-1 行格子生成的边, 返回 (E, 4) 的整数格点坐标 a0, b0, a1, b1 """
+    k, m = np.meshgrid(np.arange(k0, k0 + nx), np.arange(m0, m0 + ny), indexing='ij')
+    a = (3 * k).ravel()
+    b = (2 * m + (k & 1)).ravel()
+    top = np.column_stack((a - 1, b + 1, a + 1, b + 1))
+    upper_right = np.column_stack((a + 1, b + 1, a + 2, b))
+    lower_right = np.column_stack((a + 2, b, a + 1, b - 1))
+    return np.concatenate((top, upper_right, lower_right))
+
+
+def hex_lattice_graph(bounds, hex_size, eps=1e-9):
+    """ 矩形 bounds = (minx, miny, maxx, maxy) 内去重并按边界分割后的六边形边图
+
+    返回 (vertices, edges): vertices 为 (V, 2) 的坐标, edges 为 (E, 2) 的点索引, 每条边只出现一次.
+    格点在整数坐标下去重, 与边界的交点用解析的线段裁剪求出, 矩形边按所有落在边界上的点分段.
+    """
+    minx, miny, maxx, maxy = bounds
+    width = maxx - minx
+    height = maxy - miny
+    u = hex_size / 2
+    h = np.sqrt(3) / 2 * hex_size
+    tol = eps * hex_size
+
+    # 覆盖矩形并向外多取一圈的格子
+    nx = int(np.ceil(width / (1.5 * hex_size))) + 3
+    ny = int(np.ceil(height / (np.sqrt(3) * hex_size))) + 3
+    lattice = hex_lattice_edges(nx, ny, -1, -1)
+
+    # Liang-Barsky 线段裁剪, 全部在数组上进行
+    x0 = lattice[:, 0] * u
+    y0 = lattice[:, 1] * h
+    dx = lattice[:, 2] * u - x0
+    dy = lattice[:, 3] * h - y0
+    t0 = np.zeros(len(lattice))
+    t1 = np.ones(len(lattice))
+    keep = np.ones(len(lattice), dtype=bool)
+    for p, q in ((-dx, x0 + tol), (dx, width + tol - x0), (-dy, y0 + tol), (dy, height + tol - y0)):
+        parallel = p == 0
+        keep &= ~(parallel & (q < 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = q / p
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, t), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, t), t1)
+    length = np.hypot(dx, dy)
+    # 裁剪窗口放宽了 tol, 边界上的格点向外的斜边会留下约 2 * tol 长的残段, 与格点重合, 一并去掉
+    keep &= (t1 - t0) * length > 4 * tol
+    lattice, x0, y0, dx, dy, t0, t1, length = (v[keep] for v in (lattice, x0, y0, dx, dy, t0, t1, length))
+
+    # 裁剪量在容差内的端点仍是格点
+    start_on_lattice = t0 * length <= 2 * tol
+    end_on_lattice = (1 - t1) * length <= 2 * tol
+
+    # 格点: 在整数坐标下去重
+    ab = np.concatenate((lattice[start_on_lattice, :2], lattice[end_on_lattice, 2:]))
+    ab, lattice_id = np.unique(ab, axis=0, return_inverse=True)
+    lattice_id = lattice_id.ravel()
+    points = [np.column_stack((ab[:, 0] * u, ab[:, 1] * h))]
+
+    # 与矩形边界的交点
+    n_lattice = len(ab)
+    cut_start = np.flatnonzero(~start_on_lattice)
+    cut_end = np.flatnonzero(~end_on_lattice)
+    points.append(np.column_stack((x0[cut_start] + t0[cut_start] * dx[cut_start],
+                                   y0[cut_start] + t0[cut_start] * dy[cut_start])))
+    points.append(np.column_stack((x0[cut_end] + t1[cut_end] * dx[cut_end],
+                                   y0[cut_end] + t1[cut_end] * dy[cut_end])))
+    corners = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=float)
+    points.append(corners)
+    vertices = np.concatenate(points)
+    vertices = np.clip(vertices, 0, [width, height])
+    # 贴近边界的点精确放到边界上
+    for axis, limit in ((0, width), (1, height)):
+        vertices[np.abs(vertices[:, axis]) <= 2 * tol, axis] = 0
+        vertices[np.abs(vertices[:, axis] - limit) <= 2 * tol, axis] = limit
+
+    start = np.empty(len(lattice), dtype=np.int64)
+    end = np.empty(len(lattice), dtype=np.int64)
+    n_start = np.count_nonzero(start_on_lattice)
+    start[start_on_lattice] = lattice_id[:n_start]
+    end[end_on_lattice] = lattice_id[n_start:]
+    start[cut_start] = n_lattice + np.arange(len(cut_start))
+    end[cut_end] = n_lattice + len(cut_start) + np.arange(len(cut_end))
+
+    # 落在边界上的点按周长位置排序, 相邻两点连成矩形边的一段
+    x, y = vertices[:, 0], vertices[:, 1]
+    on_boundary = (x == 0) | (x == width) | (y == 0) | (y == height)
+    position = np.select([y == 0, x == width, y == height],
+                         [x, width + y, 2 * width + height - x], 2 * (width + height) - y)
+    boundary = np.flatnonzero(on_boundary)
+    boundary = boundary[np.argsort(position[boundary], kind='stable')]
+    # 位置相同的点 (格点恰在边界上又是交点) 合并为第一个
+    same = np.concatenate(([False], np.diff(position[boundary]) <= tol))
+    alias = np.arange(len(vertices))
+    group = np.cumsum(~same) - 1
+    alias[boundary] = boundary[~same][group]
+    boundary = boundary[~same]
+    perimeter = np.column_stack((boundary, np.roll(boundary, -1)))
+
+    edges = np.concatenate((np.column_stack((alias[start], alias[end])), perimeter))
+    edges = np.sort(edges, axis=1)
+    edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+
+    # 去掉没有用到的点并重新编号
+    used, edges = np.unique(edges, return_inverse=True)
+    edges = edges.reshape(-1, 2)
+    vertices = vertices[used] + [minx, miny]
+    return vertices, edges
+
+
+# 六边形在格点单位下的六个顶点偏移, 按逆时针排列
+hex_offsets = np.array([[2, 0], [1, 1], [-1, 1], [-2, 0], [-1, -1], [1, -1]])
+
+
+def hex_polygon_graph(polygon, hex_size, resolution=fixedpoint.resolution):
+    """ 任意 (可带孔的) shapely 多边形内的六边形填充图, 返回形式与 hex_lattice_graph 相同
+
+    格子先用预处理过的多边形分为内部、外部和边界三类: 内部格子的六条边直接由格点坐标给出,
+    只有边界格子与多边形精确求交, 交出的环 (含外轮廓和孔的对应部分) 拆成线段.
+    所有端点按 resolution 量化为定点数后合并, 边去重后每条只出现一次.
+    """
+    minx, miny, maxx, maxy = polygon.bounds
+    u = hex_size / 2
+    h = np.sqrt(3) / 2 * hex_size
+
+    # 覆盖外包矩形并向外多取一圈的格子, 格点以外包矩形左下角为原点
+    nx = int(np.ceil((maxx - minx) / (1.5 * hex_size))) + 3
+    ny = int(np.ceil((maxy - miny) / (np.sqrt(3) * hex_size))) + 3
+    k, m = np.meshgrid(np.arange(-1, nx - 1), np.arange(-1, ny - 1), indexing='ij')
+    a = (3 * k).ravel()[:, None] + hex_offsets[:, 0]
+    b = (2 * m + (k & 1)).ravel()[:, None] + hex_offsets[:, 1]
+    corners = np.stack((a * u + minx, b * h + miny), axis=-1) # (格子数, 6, 2)
+    cells = shapely.polygons(corners)
+
+    shapely.prepare(polygon)
+    inside = shapely.contains_properly(polygon, cells)
+    boundary = ~inside & shapely.intersects(polygon, cells)
+
+    # 内部格子: 相邻两个顶点连成边
+    inner = corners[inside]
+    segments = [np.concatenate((inner, np.roll(inner, -1, axis=1)), axis=2).reshape(-1, 4)]
+
+    # 边界格子: 与多边形求交后取所有环上相邻的两点
+    clipped = shapely.intersection(cells[boundary], polygon)
+    rings = shapely.get_rings(shapely.get_parts(clipped[~shapely.is_empty(clipped)]))
+    coords, ring = shapely.get_coordinates(rings, return_index=True)
+    same_ring = ring[:-1] == ring[1:]
+    segments.append(np.column_stack((coords[:-1][same_ring], coords[1:][same_ring])))
+
+    q = quantize(np.concatenate(segments), resolution)
+    q = q[unique_edges(q)]
+    points, edges = np.unique(q.reshape(-1, 2), axis=0, return_inverse=True)
+    return dequantize(points, resolution), edges.reshape(-1, 2)
+
+
+def read_dxf_outline(filename, distance=0.01):
+    """ 读取 DXF 模型空间中的轮廓线 (多段线、直线、圆弧、圆、样条等), 拼成带孔的 shapely 多边形
+
+    曲线按弦高 distance 展开为折线, 所有线段求并后打断, 由 build_area 把内层的环作为孔.
+    """
+    lines = []
+    for e in ezdxf.readfile(filename).modelspace():
+        try:
+            p = path.make_path(e)
+        except TypeError: # 文字、标注等不能转成路径的图元
+            continue
+        points = [(v.x, v.y) for v in p.flattening(distance)]
+        if len(points) >= 2:
+            lines.append(shapely.linestrings(points))
+    return shapely.build_area(shapely.union_all(lines))
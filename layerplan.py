@@ -0,0 +1,85 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from gcode import GcodeWriter
+from gridpath import Euler, saveDxf
+from pointcloud import PointCloud
+
+
+def planLayer(layer):
+    """ 规划一层, layer 为 (z, vertices, edges), 返回 (z, 图元) """
+    z, vertices, edges = layer
+    euler = Euler()
+    euler.addEdgeArrays(vertices, edges)
+    # 进程池已经按层并行, 层内的连通分量串行规划
+    path = euler.plan(workers=1)
+    return z, euler.reshapeEntities(path)
+
+
+def planLayers(layers, workers=None, inflight=None):
+    """ 用进程池逐层规划, 按层的顺序产出 (z, 图元)
+    layers 可以是惰性的生成器; 已提交但尚未产出的层 (含已完成、在等前面层的) 不超过 inflight 个,
+    某层及之前的层都完成后立即产出, 内存占用与总层数无关 """
+    if workers == 1:
+        for layer in layers:
+            yield planLayer(layer)
+        return
+    workers = workers or os.cpu_count()
+    inflight = inflight or 2*workers
+    pending = deque()
+    with ProcessPoolExecutor(workers) as pool:
+        try:
+            for layer in layers:
+                pending.append(pool.submit(planLayer, layer))
+                if len(pending) >= inflight:
+                    yield pending.popleft().result()
+                # 已完成的前几层立即产出, 不必等输入凑满 inflight 层
+                while pending and pending[0].done():
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # 出错或调用方提前停止时, 不再启动还在排队的层
+            for future in pending:
+                future.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='逐层规划点云零件的走刀路径, 每层写出一个 DXF 或全部写入一个 G 代码文件')
+    parser.add_argument('input', help='sampled_points.txt 格式的点云文件')
+    parser.add_argument('-o', '--output', default='output', help='输出目录')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='同时规划的层数')
+    parser.add_argument('--inflight', type=int, help='已提交但尚未写出的层数上限, 默认为 2 倍 jobs')
+    parser.add_argument('--pitch', type=float, default=1.0, help='点云的平面格距')
+    parser.add_argument('--diagonal', action='store_true', help='对角相邻的点之间也连边')
+    parser.add_argument('--gcode', action='store_true', help='各层按顺序写入 <零件名>.gcode, 不再逐层写 DXF')
+    parser.add_argument('--feed', type=float, default=1200, help='G 代码的加工进给 (mm/min)')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.input))[0]
+    occupancy = PointCloud(args.input).occupancy(args.pitch)
+    writer = GcodeWriter(os.path.join(args.output, stem + '.gcode'), feed=args.feed) if args.gcode else None
+    t = time.perf_counter()
+    try:
+        for k, (z, entities) in enumerate(planLayers(occupancy.layerGraphs(args.diagonal), args.jobs, args.inflight)):
+            if writer is not None:
+                # 每层完成后立即写入, 前面的层已经可以送到机床
+                writer.write(entities)
+                writer.flush()
+                output = writer.file.name
+            else:
+                output = os.path.join(args.output, '%s_layer%03d.dxf' % (stem, k))
+                saveDxf(entities, output)
+            print('[%d/%d] z=%g %s (%.3fs)' % (k + 1, len(occupancy), z, output, time.perf_counter()-t))
+    finally:
+        if writer is not None:
+            writer.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
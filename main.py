@@ -1,24 +1,109 @@
-import ezdxf
-from gridpath import Line, Arc, Euler  # 替换 'your_module' 为你的模块名
-
-# 读取 DXF 文件
-doc = ezdxf.readfile('C:/Users/zhong/Desktop/1.dxf')
-
-# 创建 Euler 对象
-euler = Euler()
-
-# 遍历所有 LINE 实体
-for entity in doc.modelspace().query('LINE'):
-    line = Line(e=entity)
-    # 将 Line 对象添加到 Euler 对象的图中
-    # 这里需要根据实际情况进行添加，比如添加到某个数据结构中
-    # 假设 euler.graph 是一个二维列表，存储 Line 对象
-    # 你可能需要根据具体情况调整代码
-    # euler.graph.append([line])
-
-# 遍历所有 ARC 实体
-for entity in doc.modelspace().query('ARC'):
-    arc = Arc(e=entity)
-    # 将 Arc 对象添加到 Euler 对象的图中
-    # 根据实际需要添加到数据结构中
-    # euler.graph.append([arc])
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gridpath import Euler, MetricsLog, saveDxf
+from pathcache import PathCache
+
+
+def findFiles(inputs):
+    """ 展开输入: 目录取其中所有 .dxf 文件, 其余按通配符匹配 """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item, '*.dxf')) + glob.glob(os.path.join(item, '*.DXF'))))
+        else:
+            files.extend(sorted(glob.glob(item)))
+    return list(dict.fromkeys(files))
+
+
+def outputStems(files):
+    """ 每个输入文件的输出名 (不含扩展名): 相对所有输入的公共目录的路径,
+    不同目录中的同名零件写到输出目录下对应的子目录, 不会互相覆盖 """
+    paths = [os.path.splitext(os.path.abspath(f))[0] for f in files]
+    try:
+        base = os.path.commonpath([os.path.dirname(p) for p in paths])
+    except ValueError:
+        # 不在同一个盘符上 (Windows), 没有公共目录, 用带盘符的完整路径
+        return [p.replace(':', '').lstrip('\\/') for p in paths]
+    return [os.path.relpath(p, base) for p in paths]
+
+
+def planFile(filename, outDir, cacheDir=None, cacheSize=1 << 30, metrics=False, stem=None):
+    """ 规划单个零件并写出结果, 出错时记录错误而不抛出, 不影响其他零件
+    输出为 <outDir>/<stem>_path.dxf, stem 默认为文件名 """
+    summary = {'file': filename, 'output': '', 'points': 0, 'odd': 0, 'added': 0, 'seconds': 0.0, 'error': ''}
+    t = time.perf_counter()
+    stem = stem or os.path.splitext(os.path.basename(filename))[0]
+    os.makedirs(os.path.dirname(os.path.join(outDir, stem)) or '.', exist_ok=True)
+    log = MetricsLog(os.path.join(outDir, stem + '_metrics.jsonl')) if metrics else None
+    try:
+        euler = Euler()
+        euler.metrics = log
+        euler.readDxf(filename)
+        summary['points'] = euler.pointCount
+        summary['odd'] = sum(d % 2 for d in euler.pointDegree)
+        # 进程池已经按零件并行, 零件内部的连通分量串行规划
+        if cacheDir:
+            path, entities = PathCache(cacheDir, cacheSize).plan(euler, workers=1)
+        else:
+            path = euler.plan(workers=1)
+            entities = euler.reshapeEntities(path)
+        summary['added'] = euler.addedEdges()
+        output = os.path.join(outDir, stem + '_path.dxf')
+        saveDxf(entities, output)
+        summary['output'] = output
+    except Exception as e:
+        summary['error'] = '%s: %s' % (type(e).__name__, ' '.join(str(e).split()))
+    finally:
+        if log is not None:
+            log.close()
+    summary['seconds'] = round(time.perf_counter()-t, 3)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量规划 DXF 零件的走刀路径')
+    parser.add_argument('inputs', nargs='+', help='DXF 文件、目录或通配符, 如 parts/*.dxf')
+    parser.add_argument('-o', '--output', default='output', help='输出目录')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='同时规划的零件数')
+    parser.add_argument('--cache', help='路径缓存目录, 相同几何的零件直接复用已有结果')
+    parser.add_argument('--cache-size', type=int, default=1024, help='路径缓存大小上限 (MB)')
+    parser.add_argument('--metrics', action='store_true', help='把各阶段的耗时和计数写入 <零件名>_metrics.jsonl')
+    args = parser.parse_args(argv)
+
+    files = findFiles(args.inputs)
+    if not files:
+        parser.error('没有找到 DXF 文件')
+    os.makedirs(args.output, exist_ok=True)
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(planFile, f, args.output, args.cache, args.cache_size << 20, args.metrics, stem): f
+                   for f, stem in zip(files, outputStems(files))}
+        for future in as_completed(futures):
+            try:
+                s = future.result()
+            except Exception as e:
+                # 工作进程异常退出 (如内存不足被杀) 时同样只记录该零件失败
+                s = {'file': futures[future], 'output': '', 'points': 0, 'odd': 0, 'added': 0, 'seconds': 0.0,
+                     'error': '%s: %s' % (type(e).__name__, e)}
+            summaries.append(s)
+            status = '失败 ' + s['error'] if s['error'] else '完成'
+            print('[%d/%d] %s %s (%.3fs)' % (len(summaries), len(files), s['file'], status, s['seconds']))
+
+    summaries.sort(key=lambda s: files.index(s['file']))
+    with open(os.path.join(args.output, 'summary.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0]))
+        writer.writeheader()
+        writer.writerows(summaries)
+    failed = sum(1 for s in summaries if s['error'])
+    print('共 %d 个零件, 失败 %d 个' % (len(summaries), failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
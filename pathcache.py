@@ -0,0 +1,131 @@
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from gridpath import Euler, typeCodes
+
+
+class PathCache:
+    """ 按几何内容寻址的路径缓存
+    键为规范化后的边集合与规划参数的哈希, 与图元的读入顺序无关;
+    命中时直接返回路径和重新生成的图元, 不再求最短路和匹配 """
+
+    # 缓存条目的格式版本, 计入键中; 格式变化后旧条目不再命中, 由 evict 逐渐删除
+    version = 2
+
+    def __init__(self, directory, maxBytes=1 << 30) -> None:
+        self.directory = directory
+        self.maxBytes = maxBytes # 缓存目录的大小上限, 超出时删除最久未用的条目
+        os.makedirs(directory, exist_ok=True)
+
+    def canonicalOrder(self, euler: Euler):
+        """ 点和边的规范顺序, 返回 (规范点表, 规范边表, 点的顺序, 点的序号, 边的顺序, 边的序号)
+        点按容差量化后的坐标排序, 边按 (类型, 端点序号, 曲线参数) 排序 """
+        q = np.round(euler.pointList/euler.tolerance).astype(np.int64)
+        order = np.lexsort((q[:, 2], q[:, 1], q[:, 0]))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        table = self.edgeTable(euler, rank)
+        edgeOrder = np.lexsort(table.T[::-1])
+        edgeRank = np.empty(len(edgeOrder), dtype=np.int64)
+        edgeRank[edgeOrder] = np.arange(len(edgeOrder))
+        return q[order], table[edgeOrder], order, rank, edgeOrder, edgeRank
+
+    def edgeTable(self, euler: Euler, rank):
+        """ 每条边一行: 类型、按点序号排好的两个端点、取整后的曲线参数 (按位存为整数) """
+        ends = np.sort(rank[euler.edges], axis=1)
+        types = euler.edgeType[:euler.edgeCount].astype(np.int64)
+        curve = euler.edgeCurve[:euler.edgeCount]
+        # 圆弧: 圆心、半径、起止角、法向; 椭圆弧: 圆心、长轴的 x y、比例、起止参数、法向
+        params = np.zeros((euler.edgeCount, 11))
+        for code, columns in ((typeCodes['ARC'], [0, 1, 2, 3, 4, 5, 6, 7, 8]),
+                              (typeCodes['ELLIPSE'], [0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 11])):
+            mask = types == code
+            params[np.ix_(mask, range(len(columns)))] = euler.curveParams[curve[mask]][:, columns]
+        params = np.round(params, 6) + 0.0 # 去掉 -0.0, 保证按位比较一致
+        return np.column_stack((types, ends, params.view(np.int64)))
+
+    def key(self, euler: Euler, canonical=None):
+        q, table = (canonical or self.canonicalOrder(euler))[:2]
+        h = hashlib.sha256()
+        h.update(repr((self.version, euler.tolerance, euler.delta, euler.delta2, euler.inf, euler.matcher)).encode())
+        h.update(q.tobytes())
+        h.update(table.tobytes())
+        return h.hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, euler: Euler, canonical=None):
+        """ 命中时恢复 euler 的重边和起点, 返回 (路径, 图元), 未命中返回 None """
+        canonical = canonical or self.canonicalOrder(euler)
+        key = self.key(euler, canonical)
+        try:
+            with open(self.filename(key), 'rb') as f:
+                path, edgeDouble, entities = pickle.load(f)
+            # 更新修改时间, 作为最近使用时间
+            os.utime(self.filename(key))
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError):
+            # 读不出或是旧格式的图元 (不能还原到当前的类) 时按未命中处理
+            return None
+        local, localEdge = canonical[2].tolist(), canonical[4].tolist()
+        path = [(local[u], local[v], localEdge[k]) for u, v, k in path]
+        euler.edgeDouble = collections.Counter((local[u], local[v]) for u, v in edgeDouble)
+        if path:
+            euler.startPoint = tuple(euler.pointList[path[0][0]].tolist())
+        return path, entities
+
+    def put(self, euler: Euler, path, entities, canonical=None):
+        canonical = canonical or self.canonicalOrder(euler)
+        key = self.key(euler, canonical)
+        rank, edgeRank = canonical[3].tolist(), canonical[5].tolist()
+        data = ([(rank[u], rank[v], edgeRank[k]) for u, v, k in path], [(rank[u], rank[v]) for u, v in euler.edgeDouble.elements()], entities)
+        # 先写临时文件再原子替换, 并行的进程不会读到写了一半的文件
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.filename(key))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """ 总大小超过上限时按最近使用时间从旧到新删除, 其他进程同时删除的文件直接跳过 """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def plan(self, euler: Euler, workers=None):
+        """ 先查缓存, 未命中时规划并写入缓存, 返回 (路径, 图元) """
+        canonical = self.canonicalOrder(euler)
+        hit = self.get(euler, canonical)
+        if hit is not None:
+            return hit
+        path = euler.plan(workers)
+        entities = euler.reshapeEntities(path)
+        self.put(euler, path, entities, canonical)
+        return path, entities
@@ -0,0 +1,140 @@
+import os
+import tempfile
+
+import numpy as np
+
+import fixedpoint
+
+
+# 层表的每一行: 层高 z 以及该层点在点表中的起止下标
+layerDtype = np.dtype([('z', 'f8'), ('start', 'i8'), ('stop', 'i8')])
+
+
+class PointCloud:
+    """ sampled_points.txt 格式 (每行 x,y,z) 点云的二进制列式缓存
+    第一次读取时解析文本, 把按 z 排好序的点表和层表写成同目录下的 .npy 旁路文件;
+    之后直接内存映射旁路文件, 不再解析文本, 取单独一层只读该层所在的页 """
+
+    def __init__(self, filename, resolution=fixedpoint.resolution) -> None:
+        self.filename = filename
+        self.resolution = resolution # z 量化后相同的点属于同一层
+        if not self.isFresh():
+            self.build()
+        self.points = np.load(self.pointsFile(), mmap_mode='r')
+        self.layers = np.load(self.layersFile())
+
+    def pointsFile(self):
+        return self.filename + '.points.npy'
+
+    def layersFile(self):
+        # 分层结果与分辨率有关, 点表与分辨率无关
+        return self.filename + '.layers-%g.npy' % self.resolution
+
+    def isFresh(self):
+        """ 旁路文件都存在且不早于文本文件 """
+        try:
+            source = os.stat(self.filename).st_mtime_ns
+            return all(os.stat(f).st_mtime_ns >= source for f in (self.pointsFile(), self.layersFile()))
+        except FileNotFoundError:
+            return False
+
+    def build(self):
+        """ 解析文本, 按 z 稳定排序后写入点表和层表 """
+        points = np.loadtxt(self.filename, delimiter=',', dtype=float, ndmin=2)
+        # 稳定排序, 同一层内保持文件中的顺序; 量化是单调的, 所以每层在点表中连续
+        points = points[np.argsort(points[:, 2], kind='stable')]
+        q = fixedpoint.quantize(points[:, 2], self.resolution)
+        start = np.flatnonzero(np.concatenate(([True], q[1:] != q[:-1])))
+        layers = np.empty(len(start), dtype=layerDtype)
+        layers['z'] = fixedpoint.dequantize(q[start], self.resolution)
+        layers['start'] = start
+        layers['stop'] = np.append(start[1:], len(points))
+        self.save(self.pointsFile(), points)
+        self.save(self.layersFile(), layers)
+
+    def save(self, filename, array):
+        # 先写临时文件再原子替换, 并行读取的进程不会映射到写了一半的文件
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp, filename)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def __len__(self):
+        return len(self.layers)
+
+    def layer(self, index):
+        """ 第 index 层的点, 是内存映射点表上的视图, 不复制数据 """
+        start, stop = self.layers['start'][index], self.layers['stop'][index]
+        return self.points[start:stop]
+
+    def layerAt(self, z):
+        """ 高度 z 所在层的点, 没有该层时返回空数组 """
+        q = fixedpoint.quantize(self.layers['z'], self.resolution)
+        key = fixedpoint.quantize(z, self.resolution)
+        index = np.searchsorted(q, key)
+        if index == len(q) or q[index] != key:
+            return self.points[:0]
+        return self.layer(index)
+
+    def occupancy(self, pitch=1.0):
+        """ 点云转为布尔占据栅格, 平面上按 pitch 取整到格点, 第 k 层即层表中的第 k 层 """
+        origin = np.asarray(self.points[:, :2].min(axis=0))
+        ij = np.rint((self.points[:, :2] - origin) / pitch).astype(np.int64)
+        k = np.repeat(np.arange(len(self.layers)), self.layers['stop'] - self.layers['start'])
+        grid = np.zeros((ij[:, 0].max() + 1, ij[:, 1].max() + 1, len(self.layers)), dtype=bool)
+        grid[ij[:, 0], ij[:, 1], k] = True
+        return Occupancy(grid, origin, pitch, np.asarray(self.layers['z']))
+
+
+class Occupancy:
+    """ 布尔占据栅格 grid[i, j, k], 格点 (i, j) 的坐标为 origin + pitch * (i, j), 第 k 层高度为 z[k] """
+
+    # 四邻域的平移量, 每对相邻格点只取一个方向
+    shifts = ((1, 0), (0, 1))
+    # 八邻域另加的两条对角方向
+    diagonalShifts = ((1, 1), (1, -1))
+
+    def __init__(self, grid, origin, pitch, z) -> None:
+        self.grid = grid
+        self.origin = origin
+        self.pitch = pitch
+        self.z = z
+
+    def __len__(self):
+        return self.grid.shape[2]
+
+    def layerGraph(self, k, diagonal=False):
+        """ 第 k 层的邻接边图, 返回 (vertices (V, 3), edges (E, 2)), 可直接交给 Euler.addEdgeArrays
+        相邻关系由整层平移后逐元素相与得到, 不做两两距离比较; 没有邻居的孤立点不输出 """
+        layer = self.grid[:, :, k]
+        ids = np.full(layer.shape, -1, dtype=np.int64)
+        ids[layer] = np.arange(np.count_nonzero(layer))
+        edges = []
+        for di, dj in self.shifts + (self.diagonalShifts if diagonal else ()):
+            src = (shiftSlice(layer.shape[0], -di), shiftSlice(layer.shape[1], -dj))
+            dst = (shiftSlice(layer.shape[0], di), shiftSlice(layer.shape[1], dj))
+            both = layer[src] & layer[dst]
+            edges.append(np.column_stack((ids[src][both], ids[dst][both])))
+        edges = np.concatenate(edges)
+
+        # 去掉孤立点并重新编号
+        used, edges = np.unique(edges, return_inverse=True)
+        i, j = np.nonzero(layer)
+        vertices = np.column_stack((self.origin[0] + i[used]*self.pitch, self.origin[1] + j[used]*self.pitch,
+                                    np.full(len(used), self.z[k])))
+        return vertices, edges.reshape(-1, 2)
+
+    def layerGraphs(self, diagonal=False):
+        """ 逐层生成 (z, vertices, edges) """
+        for k in range(len(self)):
+            yield (self.z[k], *self.layerGraph(k, diagonal))
+
+
+def shiftSlice(n, d):
+    """ 长度为 n 的轴平移 d 后与原轴重叠部分在原轴上的切片 """
+    return slice(max(0, d), n + min(0, d))
@@ -3,51 +3,74 @@ import matplotlib.patches as patches
 from shapely.geometry import Polygon, box, LineString, Point
 from shapely.ops import split
 import numpy as np
+import shapely
+
+import fixedpoint
+from fixedpoint import dequantize, quantize, unique_edges
+
+
+# 求交会按 GEOS 的规则重排多边形的顶点 (起点和方向), 完全在矩形内的格子也不例外;
+# 用一个格子求交一次, 得到输出顶点在原顶点中的下标
+def ring_order(ring, rect):
+    result = shapely.get_coordinates(shapely.get_exterior_ring(rect.intersection(shapely.polygons(ring))))[:-1]
+    return [int(np.flatnonzero((ring == p).all(axis=1))[0]) for p in result]
 
 
 # 生成六边形格栅
+# 所有格子的中心和顶点一次用 NumPy 广播算出, 完全在矩形内的格子不再求交, 只按 ring_order 重排顶点,
+# 其余格子用 shapely 2.x 的数组运算一次求交, 结果与逐格 rect.intersection 相同 (包括顶点的起点和方向)
 def generate_hex_grid(rect, hex_size):
     minx, miny, maxx, maxy = rect.bounds
     dx = 3 / 2 * hex_size
     dy = np.sqrt(3) * hex_size
 
-    hexagons = []
-    for x in np.arange(minx - hex_size, maxx + hex_size, dx):
-        for y in np.arange(miny - hex_size, maxy + hex_size, dy):
-            if int(x / dx) % 2 == 0:
-                y_offset = y
-            else:
-                y_offset = y + dy / 2
+    # 与逐格循环的顺序一致: 外层 x, 内层 y
+    x, y = np.meshgrid(np.arange(minx - hex_size, maxx + hex_size, dx),
+                       np.arange(miny - hex_size, maxy + hex_size, dy), indexing='ij')
+    x = x.ravel()
+    y = y.ravel()
+    y_offset = np.where(np.trunc(x / dx).astype(int) % 2 == 0, y, y + dy / 2)
 
-            hexagon = Polygon([
-                (x + hex_size * np.cos(np.radians(angle)), y_offset + hex_size * np.sin(np.radians(angle)))
-                for angle in range(0, 360, 60)
-            ])
-            intersection = rect.intersection(hexagon)
-            if intersection.is_valid:
-                hexagons.append(intersection)
+    angles = np.radians(np.arange(0, 360, 60))
+    coords = np.stack([x[:, None] + hex_size * np.cos(angles),
+                       y_offset[:, None] + hex_size * np.sin(angles)], axis=-1)
+    cells = shapely.polygons(coords)
 
-    return hexagons
+    shapely.prepare(rect)
+    inside = shapely.within(cells, rect)
+    hexagons = cells.copy()
+    hexagons[~inside] = shapely.intersection(rect, cells[~inside])
+    if inside.any():
+        order = ring_order(coords[np.argmax(inside)], rect)
+        hexagons[inside] = shapely.polygons(coords[inside][:, order])
+    return list(hexagons[shapely.is_valid(hexagons)])
 
 
 # 检查并分割矩形边
+# 用 STRtree 只取与矩形边相交的格子, 再在坐标数组上直接判断顶点是否落在边上
 def check_and_split_rect_edges(rect, hexagons):
     rect_edges = [LineString([rect.exterior.coords[i], rect.exterior.coords[i + 1]]) for i in
                   range(len(rect.exterior.coords) - 1)]
     split_edges = []
 
+    polygons = np.array([hexagon for hexagon in hexagons if isinstance(hexagon, Polygon)], dtype=object)
+    tree = shapely.STRtree(polygons)
+
     for edge in rect_edges:
-        split_points = []
-        for hexagon in hexagons:
-            if isinstance(hexagon, Polygon):  # 确保 hexagon 是 Polygon 对象
-                for point in hexagon.exterior.coords:
-                    point_obj = Point(point)
-                    if edge.intersects(point_obj):
-                        split_points.append(point_obj)
+        candidates = polygons[tree.query(edge, predicate='intersects')]
+        coords = shapely.get_coordinates(shapely.get_exterior_ring(candidates))
+        (x0, y0), (x1, y1) = edge.coords
+        # 叉积为 0 且在边的包围盒内即在边上, 矩形边与坐标轴平行时这一判断是精确的
+        cross = (x1 - x0) * (coords[:, 1] - y0) - (y1 - y0) * (coords[:, 0] - x0)
+        on_edge = ((cross == 0) &
+                   (coords[:, 0] >= min(x0, x1)) & (coords[:, 0] <= max(x0, x1)) &
+                   (coords[:, 1] >= min(y0, y1)) & (coords[:, 1] <= max(y0, y1)))
+        points = np.unique(coords[on_edge], axis=0)
 
         # 如果找到分割点，则按分割点分割边
-        if split_points:
-            split_points = sorted(set(split_points), key=lambda p: edge.project(p))
+        if len(points):
+            split_points = shapely.points(points)
+            split_points = split_points[np.argsort(shapely.line_locate_point(edge, split_points), kind='stable')]
             split_segments = []
             prev_point = Point(edge.coords[0])
             for p in split_points:
@@ -64,55 +87,45 @@ def check_and_split_rect_edges(rect, hexagons):
 
 
 # 删除起点和终点相同的边，并移除小于指定精度的边
+# 端点按 tolerance 量化为定点数后, 在整数数组上规范化方向并用 np.unique 去重
 def remove_duplicate_edges(edges, tolerance=1e-2):
-    filtered_edges = []
-    seen_edges = set()
-
-    for edge in edges:
-        start, end = edge.coords[0], edge.coords[-1]
-        start = (round(start[0], 2), round(start[1], 2))
-        end = (round(end[0], 2), round(end[1], 2))
-        # 生成边的标准形式，确保起点在前
-        if start > end:
-            start, end = end, start
-        edge_tuple = (start, end)
-
-        if edge_tuple not in seen_edges:
-            seen_edges.add(edge_tuple)
-            if not (start == end):
-                filtered_edges.append(edge)
-
-    return filtered_edges
+    if len(edges) == 0:
+        return []
+    start = shapely.get_coordinates(shapely.get_point(edges, 0))
+    end = shapely.get_coordinates(shapely.get_point(edges, -1))
+    q = quantize(np.column_stack((start, end)), tolerance)
+    return [edges[i] for i in unique_edges(q)]
 
 
 # 处理并输出边
-def process_and_output_edges(hexagons, rect):
-    edges = []
-
-    # 分割并添加矩形的边
+def process_and_output_edges(hexagons, rect, resolution=fixedpoint.resolution):
+    # 分割后的矩形边, 每条都只有两个端点
     rect_edges = check_and_split_rect_edges(rect, hexagons)
-    print("分割后的矩形边:")
-    for edge in rect_edges:
-        formatted_coords = [(round(x, 2), round(y, 2)) for x, y in edge.coords]
-        if len(formatted_coords) == 2 and formatted_coords[0] != formatted_coords[1]:
-            edges.append(LineString(formatted_coords))
-            print(f"Edge: {formatted_coords}")
+    rect_q = quantize(shapely.get_coordinates(rect_edges).reshape(-1, 4), resolution)
+
+    # 六边形的边: 外环上相邻的两点
+    polygons = [hexagon for hexagon in hexagons if isinstance(hexagon, Polygon)]  # 确保 hexagon 是 Polygon 对象
+    coords, ring = shapely.get_coordinates(shapely.get_exterior_ring(polygons), return_index=True)
+    same_ring = ring[:-1] == ring[1:]
+    hex_q = quantize(np.column_stack((coords[:-1][same_ring], coords[1:][same_ring])), resolution)
 
-    # 处理六边形的边
+    print("分割后的矩形边:")
+    print_edges(rect_q, resolution)
     print("六边形边:")
-    for hexagon in hexagons:
-        if isinstance(hexagon, Polygon):  # 确保 hexagon 是 Polygon 对象
-            for i in range(len(hexagon.exterior.coords) - 1):
-                edge = LineString([hexagon.exterior.coords[i], hexagon.exterior.coords[i + 1]])
-                if edge.length > 0:
-                    formatted_coords = [(round(x, 2), round(y, 2)) for x, y in edge.coords]
-                    if len(formatted_coords) == 2 and formatted_coords[0] != formatted_coords[1]:
-                        edges.append(LineString(formatted_coords))
-                        print(f"Edge: {formatted_coords}")
+    print_edges(hex_q, resolution)
+
+    # 删除起点和终点相同的边，并移除方向相反的重复边
+    q = np.concatenate((rect_q, hex_q))
+    q = q[unique_edges(q)]
+    return list(shapely.linestrings(dequantize(q, resolution).reshape(-1, 2, 2)))
+
 
-    # 删除起点和终点相同的边，并移除小于指定容差的边
-    edges = remove_duplicate_edges(edges)
-    return edges
+# 逐条打印量化后长度不为 0 的边
+def print_edges(q, resolution):
+    coords = dequantize(q, resolution).tolist()
+    for (x0, y0, x1, y1), degenerate in zip(coords, np.all(q[:, :2] == q[:, 2:], axis=1)):
+        if not degenerate:
+            print(f"Edge: {[(x0, y0), (x1, y1)]}")
 
 
 # 绘制矩形和六边形格栅
@@ -128,13 +141,14 @@ def plot_hex_grid(edges, rect):
     plt.show()
 
 
-# 定义矩形范围
-rect = box(0, 0, 10, 8)
+if __name__ == "__main__":
+    # 定义矩形范围
+    rect = box(0, 0, 10, 8)
 
-# 生成六边形格栅并处理边
-hex_size = 1  # 六边形的大小
-hexagons = generate_hex_grid(rect, hex_size)
-edges = process_and_output_edges(hexagons, rect)
+    # 生成六边形格栅并处理边
+    hex_size = 1  # 六边形的大小
+    hexagons = generate_hex_grid(rect, hex_size)
+    edges = process_and_output_edges(hexagons, rect)
 
-# 可视化结果
-plot_hex_grid(edges, rect)
+    # 可视化结果
+    plot_hex_grid(edges, rect)
@@ -2,163 +2,202 @@ import numpy as np
 import matplotlib.pyplot as plt
 from shapely.geometry import LineString, Point
 
+from fixedpoint import canonical_edges, dequantize, quantize
+
 
 class EdgePrinter:
-    import numpy as np
-    import matplotlib.pyplot as plt
-    from shapely.geometry import LineString, Point
-
-    class EdgePrinter:
-        def __init__(self, width, height, hex_size, precision=2):
-            self.width = width
-            self.height = height
-            self.hex_size = hex_size
-            self.precision = precision  # Precision for rounding
-            self.precision_threshold = 0.02  # Precision threshold for merging points
-            self.hexagons = self.generate_hex_grid()
-            self.rectangle_edges = self.get_rectangle_edges()
-            self.hexagon_edges = self.get_hexagon_edges()
-            self.split_rectangle_edges = self.split_edges_by_intersections()
-            self.sorted_edges = self.sort_edges(self.split_rectangle_edges)
-
-        def generate_hex_grid(self):
-            num_hex_x = int(self.width // (3 / 2 * self.hex_size))
-            num_hex_y = int(self.height // (np.sqrt(3) * self.hex_size))
-
-            hexagons = []
-
-            for i in range(num_hex_x + 1):
-                for j in range(num_hex_y + 1):
-                    x = round(i * 3 / 2 * self.hex_size, 2)
-                    y = round(j * np.sqrt(3) * self.hex_size, 2)
-
-                    if i % 2 == 1:
-                        y = round(y + np.sqrt(3) / 2 * self.hex_size, 2)  # Offset every other row
-
-                    hexagon = self.create_hexagon(x, y, self.hex_size)
-                    hexagons.append(hexagon)
-
-            return hexagons
-
-        def create_hexagon(self, x_center, y_center, size):
-            angles = np.linspace(0, 2 * np.pi, 7)
-            x_hex = np.round(x_center + size * np.cos(angles), 2)
-            y_hex = np.round(y_center + size * np.sin(angles), 2)
-            return list(zip(x_hex, y_hex))
-
-        def get_rectangle_edges(self):
-            vertices = [
-                (0, 0, 0),
-                (self.width, 0, 0),
-                (self.width, self.height, 0),
-                (0, self.height, 0)
-            ]
-
-            edges = []
-            for i in range(len(vertices)):
-                start_vertex = vertices[i]
-                end_vertex = vertices[(i + 1) % len(vertices)]
-                edges.append((self.normalize_point(start_vertex), self.normalize_point(end_vertex)))
-
-            return edges
-
-        def get_hexagon_edges(self):
-            edges = set()
-            for hexagon in self.hexagons:
-                for i in range(len(hexagon) - 1):
-                    edge = tuple(sorted((self.normalize_point((hexagon[i][0], hexagon[i][1], 0)),
-                                         self.normalize_point((hexagon[i + 1][0], hexagon[i + 1][1], 0)))))
-                    edges.add(edge)
-            return list(edges)
-
-        def split_edges_by_intersections(self):
-            new_edges = set()
-            for rect_edge in self.rectangle_edges:
-                rect_line = LineString([rect_edge[0][:2], rect_edge[1][:2]])
-                intersections = []
-
-                for hex_edge in self.hexagon_edges:
-                    hex_line = LineString([hex_edge[0][:2], hex_edge[1][:2]])
-                    if rect_line.intersects(hex_line):
-                        intersection = rect_line.intersection(hex_line)
-                        if isinstance(intersection, Point):
-                            intersections.append(
-                                self.normalize_point((round(intersection.x, 2), round(intersection.y, 2), 0)))
-                        elif isinstance(intersection, LineString):
-                            intersections.extend([self.normalize_point((round(pt[0], 2), round(pt[1], 2), 0)) for pt in
-                                                  intersection.coords])
-
-                # Normalize and sort intersections
-                intersections = sorted(set(self.normalize_point(p) for p in intersections),
-                                       key=lambda p: np.hypot(p[0] - rect_edge[0][0], p[1] - rect_edge[0][1]))
-                split_points = [rect_edge[0]] + intersections + [rect_edge[1]]
-
-                for i in range(len(split_points) - 1):
-                    p1 = self.normalize_point(split_points[i])
-                    p2 = self.normalize_point(split_points[i + 1])
-                    if not self.is_same_point(p1, p2, tolerance=self.precision_threshold):
-                        edge = tuple(sorted((p1, p2)))
-                        new_edges.add(edge)
-
-            return list(new_edges)
-
-        def is_same_point(self, point1, point2, tolerance=0.02):
-            return (
-                    abs(point1[0] - point2[0]) < tolerance and
-                    abs(point1[1] - point2[1]) < tolerance and
-                    abs(point1[2] - point2[2]) < tolerance
-            )
-
-        def normalize_point(self, point):
-            return (
-                round(point[0], self.precision),
-                round(point[1], self.precision),
-                round(point[2], self.precision)
-            )
-
-        def sort_edges(self, edges):
-            def sort_key(edge):
-                p1, p2 = edge
-                return (p1[0], p1[1], p1[2], p2[0], p2[1], p2[2])
-
-            return sorted(edges, key=sort_key)
-
-        def print_edges(self):
-            print("Sorted Rectangle Edges:")
-            for edge in self.sorted_edges:
-                print(f"{edge[0]}, {edge[1]}")
-
-            print("\nHexagon Edges:")
-            for edge in self.hexagon_edges:
-                print(f"{edge[0]}, {edge[1]}")
-
-        def plot_edges(self):
-            plt.figure(figsize=(10, 10))
-
-            for edge in self.sorted_edges:
-                x_values = [edge[0][0], edge[1][0]]
-                y_values = [edge[0][1], edge[1][1]]
-                plt.plot(x_values, y_values, 'r-')
-
-            for hexagon in self.hexagons:
-                hex_x, hex_y = zip(*hexagon)
-                plt.plot(hex_x, hex_y, 'b-')
-
-            plt.xlim(0, self.width)
-            plt.ylim(0, self.height)
-            plt.gca().set_aspect('equal', adjustable='box')
-            plt.show()
-
-    # Example usage
-    if __name__ == "__main__":
-        # Parameters
-        width = 20  # Width of the rectangle
-        height = 15  # Height of the rectangle
-        hex_size = 1  # Size of each hexagon
-
-        edge_printer = EdgePrinter(width, height, hex_size)
-        edge_printer.print_edges()  # Print the sorted rectangle edges and hexagon edges
-        edge_printer.plot_edges()  # Plot the edges (optional)
+    def __init__(self, width, height, hex_size, precision=2, mode='analytic'):
+        self.width = width
+        self.height = height
+        self.hex_size = hex_size
+        self.precision = precision  # Precision for rounding
+        self.resolution = 10.0 ** -precision  # Fixed-point resolution
+        self.precision_threshold = 0.02  # Precision threshold for merging points
+        self.mode = mode  # How rectangle edges are split: 'analytic' or 'shapely'
+        self.hexagons = self.generate_hex_grid()
+        self.rectangle_edges = self.get_rectangle_edges()
+        self.hexagon_array = self.get_hexagon_edge_array()
+        self.hexagon_edges = self.get_hexagon_edges()
+        self.split_rectangle_edges = self.split_edges_by_intersections()
+        self.sorted_edges = self.sort_edges(self.split_rectangle_edges)
+
+    def generate_hex_grid(self):
+        num_hex_x = int(self.width // (3 / 2 * self.hex_size))
+        num_hex_y = int(self.height // (np.sqrt(3) * self.hex_size))
+
+        # Center coordinates only depend on the column or the row, so they are rounded once per column/row
+        # and broadcast in the same order as a nested loop over i, j
+        x = np.array([round(i * 3 / 2 * self.hex_size, 2) for i in range(num_hex_x + 1)])
+        y = np.array([round(j * np.sqrt(3) * self.hex_size, 2) for j in range(num_hex_y + 1)])
+        y_odd = np.array([round(v + np.sqrt(3) / 2 * self.hex_size, 2) for v in y])  # Offset every other row
+        y = np.where(np.arange(num_hex_x + 1)[:, None] % 2 == 1, y_odd, y)
+        x = np.broadcast_to(x[:, None], y.shape)
+
+        return self.create_hexagon(x.ravel(), y.ravel(), self.hex_size)
+
+    def create_hexagon(self, x_center, y_center, size):
+        # Works on scalars or arrays of centers; the last axis holds the 7 closed-ring vertices
+        angles = np.linspace(0, 2 * np.pi, 7)
+        x_hex = np.round(np.expand_dims(x_center, -1) + size * np.cos(angles), 2)
+        y_hex = np.round(np.expand_dims(y_center, -1) + size * np.sin(angles), 2)
+        return np.stack((x_hex, y_hex), axis=-1)
+
+    def get_rectangle_edges(self):
+        vertices = [
+            (0, 0, 0),
+            (self.width, 0, 0),
+            (self.width, self.height, 0),
+            (0, self.height, 0)
+        ]
+
+        edges = []
+        for i in range(len(vertices)):
+            start_vertex = vertices[i]
+            end_vertex = vertices[(i + 1) % len(vertices)]
+            edges.append((self.normalize_point(start_vertex), self.normalize_point(end_vertex)))
+
+        return edges
+
+    def get_hexagon_edge_array(self):
+        # Quantize all hexagon sides once and deduplicate them on an (N, 6) integer array
+        hexagons = np.asarray(self.hexagons, dtype=float)
+        xy = np.concatenate((hexagons[:, :-1], hexagons[:, 1:]), axis=2).reshape(-1, 4)
+        zero = np.zeros(len(xy))
+        q = quantize(np.column_stack((xy[:, :2], zero, xy[:, 2:], zero)), self.resolution)
+        return np.unique(canonical_edges(q), axis=0)
+
+    def get_hexagon_edges(self):
+        return self.edges_from_array(self.hexagon_array)
+
+    def edges_from_array(self, q):
+        coords = dequantize(q, self.resolution).tolist()
+        return [(tuple(c[:3]), tuple(c[3:])) for c in coords]
+
+    def split_edges_by_intersections(self):
+        if self.mode == 'analytic':
+            return self.split_edges_analytic()
+        if self.mode == 'shapely':
+            return self.split_edges_by_shapely()
+        raise ValueError(f"Unknown split mode: {self.mode}")
+
+    def split_edges_analytic(self):
+        # Rectangle edges are axis-aligned, so every crossing with a hexagon edge has a closed form.
+        # All hexagon edges are clipped at once on the fixed-point array; no per-pair geometry is built.
+        q = self.hexagon_array
+        width, height = quantize((self.width, self.height), self.resolution)
+        threshold = round(self.precision_threshold / self.resolution)
+        pieces = []
+        # (constant axis, its value, range of the other axis)
+        for axis, value, lo, hi in ((1, 0, 0, width), (0, width, 0, height), (1, height, 0, width), (0, 0, 0, height)):
+            along = self.clip_to_side(q, axis, value, lo, hi)
+            along = np.unique(np.concatenate((along, [lo, hi])))
+            # Consecutive split points closer than the threshold are not kept as an edge
+            start, end = along[:-1], along[1:]
+            keep = end - start >= threshold
+            start, end = start[keep], end[keep]
+            segment = np.zeros((len(start), 6), dtype=np.int64)
+            segment[:, axis] = value
+            segment[:, 3 + axis] = value
+            segment[:, 1 - axis] = start
+            segment[:, 4 - axis] = end
+            pieces.append(segment)
+        edges = np.unique(canonical_edges(np.concatenate(pieces)), axis=0)
+        return self.edges_from_array(edges)
+
+    def clip_to_side(self, q, axis, value, lo, hi):
+        # Positions along a rectangle side (coordinate `axis` == value) where hexagon edges touch it
+        a0, a1 = q[:, axis], q[:, 3 + axis]
+        b0, b1 = q[:, 1 - axis], q[:, 4 - axis]
+        crossing = (np.minimum(a0, a1) <= value) & (np.maximum(a0, a1) >= value) & (a0 != a1)
+        a0c, a1c, b0c, b1c = a0[crossing], a1[crossing], b0[crossing], b1[crossing]
+        along = np.rint(b0c + (value - a0c) * (b1c - b0c) / (a1c - a0c)).astype(np.int64)
+        # Hexagon edges lying on the side contribute the ends of their overlap
+        collinear = (a0 == value) & (a1 == value)
+        start = np.maximum(np.minimum(b0, b1)[collinear], lo)
+        end = np.minimum(np.maximum(b0, b1)[collinear], hi)
+        overlap = start <= end
+        along = np.concatenate((along, start[overlap], end[overlap]))
+        return along[(along >= lo) & (along <= hi)]
+
+    def split_edges_by_shapely(self):
+        new_edges = set()
+        for rect_edge in self.rectangle_edges:
+            rect_line = LineString([rect_edge[0][:2], rect_edge[1][:2]])
+            intersections = []
+
+            for hex_edge in self.hexagon_edges:
+                hex_line = LineString([hex_edge[0][:2], hex_edge[1][:2]])
+                if rect_line.intersects(hex_line):
+                    intersection = rect_line.intersection(hex_line)
+                    if isinstance(intersection, Point):
+                        intersections.append(
+                            self.normalize_point((round(intersection.x, 2), round(intersection.y, 2), 0)))
+                    elif isinstance(intersection, LineString):
+                        intersections.extend([self.normalize_point((round(pt[0], 2), round(pt[1], 2), 0)) for pt in
+                                              intersection.coords])
+
+            # Normalize and sort intersections
+            intersections = sorted(set(self.normalize_point(p) for p in intersections),
+                                   key=lambda p: np.hypot(p[0] - rect_edge[0][0], p[1] - rect_edge[0][1]))
+            split_points = [rect_edge[0]] + intersections + [rect_edge[1]]
+
+            for i in range(len(split_points) - 1):
+                p1 = self.normalize_point(split_points[i])
+                p2 = self.normalize_point(split_points[i + 1])
+                if not self.is_same_point(p1, p2, tolerance=self.precision_threshold):
+                    edge = tuple(sorted((p1, p2)))
+                    new_edges.add(edge)
+
+        return list(new_edges)
+
+    def is_same_point(self, point1, point2, tolerance=0.02):
+        return (
+                abs(point1[0] - point2[0]) < tolerance and
+                abs(point1[1] - point2[1]) < tolerance and
+                abs(point1[2] - point2[2]) < tolerance
+        )
+
+    def normalize_point(self, point):
+        # Same fixed-point rounding as fixedpoint.quantize, without going through an array
+        scale = 1 / self.resolution
+        return (
+            round(point[0] * scale) / scale,
+            round(point[1] * scale) / scale,
+            round(point[2] * scale) / scale
+        )
+
+    def sort_edges(self, edges):
+        def sort_key(edge):
+            p1, p2 = edge
+            return (p1[0], p1[1], p1[2], p2[0], p2[1], p2[2])
+
+        return sorted(edges, key=sort_key)
+
+    def print_edges(self):
+        print("Sorted Rectangle Edges:")
+        for edge in self.sorted_edges:
+            print(f"{edge[0]}, {edge[1]}")
+
+        print("\nHexagon Edges:")
+        for edge in self.hexagon_edges:
+            print(f"{edge[0]}, {edge[1]}")
+
+    def plot_edges(self):
+        plt.figure(figsize=(10, 10))
+
+        for edge in self.sorted_edges:
+            x_values = [edge[0][0], edge[1][0]]
+            y_values = [edge[0][1], edge[1][1]]
+            plt.plot(x_values, y_values, 'r-')
+
+        for hexagon in self.hexagons:
+            hex_x, hex_y = zip(*hexagon)
+            plt.plot(hex_x, hex_y, 'b-')
+
+        plt.xlim(0, self.width)
+        plt.ylim(0, self.height)
+        plt.gca().set_aspect('equal', adjustable='box')
+        plt.show()
 
 
 # Example usage
@@ -0,0 +1,28 @@
+import importlib.util
+import os
+
+import pytest
+
+# test.py 不是包内模块, 按文件路径加载
+spec = importlib.util.spec_from_file_location('edge_printer', os.path.join(os.path.dirname(__file__), '..', 'test.py'))
+edge_printer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(edge_printer)
+
+
+@pytest.mark.parametrize('width, height, hex_size', [
+    (20, 15, 1),
+    (10, 10, 1),
+    (7.5, 4.2, 0.6),
+    (12, 9, 1.7),
+    (3, 2 * 3 ** 0.5, 1), # 边界经过格点
+])
+def test_analytic_split_matches_shapely(width, height, hex_size):
+    analytic = edge_printer.EdgePrinter(width, height, hex_size, mode='analytic')
+    shapely_split = edge_printer.EdgePrinter(width, height, hex_size, mode='shapely')
+    assert analytic.sorted_edges
+    assert analytic.sorted_edges == shapely_split.sorted_edges
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        edge_printer.EdgePrinter(5, 5, 1, mode='exact')
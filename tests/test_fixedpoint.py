@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+from fixedpoint import canonical_edges, dequantize, quantize, unique_edges
+
+
+def test_quantize_matches_round():
+    rng = random.Random(0)
+    values = [rng.uniform(-100, 100) for _ in range(1000)] + [0.125, -0.125, 0.375, 1.005, -0.0]
+    q = quantize(values)
+    assert [round(x, 2) for x in values] == dequantize(q).tolist()
+
+
+def test_quantize_rounds_the_scaled_value():
+    # 2.675 的十进制精确值略小于 2.675, round 得 2.67; 乘以 100 后恰为 267.5, 取偶得 268
+    assert quantize([2.675]).tolist() == [268]
+
+
+def brute_force_unique(edges):
+    seen = set()
+    kept = []
+    for i, (a, b, c, d) in enumerate(edges):
+        key = frozenset(((a, b), (c, d)))
+        if (a, b) == (c, d) or key in seen:
+            continue
+        seen.add(key)
+        kept.append(i)
+    return kept
+
+
+def test_unique_edges_matches_brute_force():
+    rng = np.random.default_rng(0)
+    edges = rng.integers(0, 4, size=(500, 4))
+    # 混入方向相反的重边和退化边
+    edges[100:150] = edges[:50][:, [2, 3, 0, 1]]
+    edges[150:160, 2:] = edges[150:160, :2]
+    assert unique_edges(edges).tolist() == brute_force_unique(edges.tolist())
+
+
+def test_canonical_edges_orders_endpoints():
+    edges = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [2, 2, 2, 2]])
+    assert canonical_edges(edges).tolist() == [[0, 0, 1, 0], [0, 0, 0, 1], [0, 0, 0, 1], [2, 2, 2, 2]]
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from gcode import GcodeWriter
+from gridpath import Arc, Line
+
+
+def gcode(entities, **kwargs):
+    f = io.StringIO()
+    with GcodeWriter(f, **kwargs) as writer:
+        writer.write(entities)
+    return f.getvalue().splitlines()
+
+
+quarter = Arc(center=(0, 0, 0), radius=1, start_angle=0, end_angle=90)
+# 法向朝 -z 的镜像圆弧: WCS 中从 (-1, 0) 顺时针到 (0, 1)
+mirrored = Arc(center=(0, 0, 0), radius=1, start_angle=0, end_angle=90, extrusion=(0, 0, -1))
+
+
+@pytest.mark.parametrize('entities, expected', [
+    # 从起点进入, 逆时针
+    ([quarter], ['G0 X1.000 Y0.000 Z0.000 F6000', 'G3 X0.000 Y1.000 I-1.000 J0.000 F1200']),
+    # 从终点一侧进入, 反向走为顺时针
+    ([Line(start=(0, 2, 0), end=(0, 1, 0)), quarter],
+     ['G0 X0.000 Y2.000 Z0.000 F6000', 'G1 Y1.000 F1200', 'G2 X1.000 Y0.000 I0.000 J-1.000']),
+    ([mirrored], ['G0 X-1.000 Y0.000 Z0.000 F6000', 'G2 X0.000 Y1.000 I1.000 J0.000 F1200']),
+    ([Line(start=(0, 2, 0), end=(0, 1, 0)), mirrored],
+     ['G0 X0.000 Y2.000 Z0.000 F6000', 'G1 Y1.000 F1200', 'G3 X-1.000 Y0.000 I0.000 J-1.000']),
+])
+def test_arc_direction_and_center_offset(entities, expected):
+    assert gcode(entities) == ['G21', 'G90'] + expected
+
+
+def test_modal_words_and_zero_length_moves():
+    entities = [Line(start=(0, 0, 0), end=(1, 0, 0)),
+                Line(start=(1, 0, 0), end=(1, 0.0004, 0)), # 格式化后不动, 不输出
+                Line(start=(1, 0, 0), end=(1, 1, 0))]
+    assert gcode(entities) == ['G21', 'G90', 'G0 X0.000 Y0.000 Z0.000 F6000', 'G1 X1.000 F1200', 'G1 Y1.000']
+
+
+def test_travel_between_disconnected_pieces():
+    entities = [Line(start=(0, 0, 0), end=(1, 0, 0)),
+                Line(start=(1.005, 0, 0), end=(2, 0, 0)), # 在 tolerance 内, 视为相接
+                Line(start=(5, 5, 0), end=(6, 5, 0))]
+    assert gcode(entities) == ['G21', 'G90', 'G0 X0.000 Y0.000 Z0.000 F6000', 'G1 X1.000 F1200',
+                               'G1 X2.000', 'G0 X5.000 Y5.000 F6000', 'G1 X6.000 F1200']
+
+
+class CountingFile(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def test_small_buffer_flushes_in_blocks():
+    entities = [Line(start=(i, 0, 0), end=(i + 1, 0, 0)) for i in range(20)]
+    f = CountingFile()
+    writer = GcodeWriter(f, bufferSize=40)
+    writer.write(entities)
+    # 缓冲区满 40 个字符就整块写出, 关闭前已经写过多次, 剩下的不足一块
+    assert f.writes > 1
+    assert len(''.join(writer.buffer)) + len(writer.buffer) < 40
+    writer.close()
+    lines = f.getvalue().splitlines()
+    assert lines == gcode(entities)
+    assert writer.moves == 21
@@ -0,0 +1,299 @@
+import collections
+import math
+import random
+
+import pytest
+
+from gridpath import Arc, Ellipse, Euler, Line
+
+
+def brute_force_index(points, point, tolerance):
+    """ 原来的 getPointIndex: 逐个比较, 取第一个在容差内的点 """
+    for i, p in enumerate(points):
+        if all(abs(p[k]-point[k]) <= tolerance for k in range(3)):
+            return i
+    points.append(point)
+    return len(points)-1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_spatial_hash_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    euler = Euler()
+    points = []
+    for _ in range(400):
+        # 坐标取容差附近的值, 包括负数和正好落在网格边界上的点
+        point = tuple(rnd.choice((-1, 1))*rnd.randrange(0, 12)*0.05 + rnd.choice((0, 0.1, -0.1, rnd.uniform(-0.12, 0.12)))
+                      for _ in range(3))
+        assert euler.getPointIndex(point) == brute_force_index(points, point, euler.tolerance)
+    assert euler.pointCount == len(points)
+
+
+def random_euler(seed, n=12, chords=4, tails=4, scale=1):
+    """ 整数坐标上的随机连通图: 一条链, 加几条弦和几条悬挂的尾巴 """
+    rnd = random.Random(seed)
+    points = rnd.sample([(x, y, 0) for x in range(8) for y in range(8)], n)
+    edges = {(i, i+1) for i in range(n-1)}
+    while len(edges) < n-1+chords:
+        edges.add(tuple(sorted(rnd.sample(range(n), 2))))
+    for _ in range(tails):
+        a = rnd.randrange(len(points))
+        points.append((points[a][0]+0.5, points[a][1]+0.25*len(points), 0))
+        edges.add((a, len(points)-1))
+    euler = Euler()
+    for i, j in sorted(edges):
+        euler.addEntity(Line(start=[c*scale for c in points[i]], end=[c*scale for c in points[j]]))
+    return euler
+
+
+def added_length(euler):
+    return sum(n*euler.edgeLength(euler.graph[u][v]) for (u, v), n in euler.edgeDouble.items() if u < v)
+
+
+def test_doubled_edges_follow_the_shortest_path():
+    # A-B 之间是长 pi 的圆弧, 另有 A-C-B 两条直线共长 2.83, A B 各挂一条尾巴
+    euler = Euler()
+    euler.addEntity(Arc(center=(0, 0, 0), radius=1, start_angle=180, end_angle=0))
+    euler.addEntity(Line(start=(-1, 0, 0), end=(0, -1, 0)))
+    euler.addEntity(Line(start=(0, -1, 0), end=(1, 0, 0)))
+    euler.addEntity(Line(start=(-1, 0, 0), end=(-2, 0, 0)))
+    euler.addEntity(Line(start=(1, 0, 0), end=(2, 0, 0)))
+    path = euler.plan(workers=1)
+    assert set(euler.edgeDouble) == {(0, 2), (2, 0), (2, 1), (1, 2)}
+    assert len(path) == euler.edgeCount + 2
+
+
+def test_parallel_edges_are_kept_apart():
+    # 整圆存为两段 180 度的圆弧, 再加一条尾巴
+    euler = Euler()
+    euler.addEntity(Arc(center=(0, 0, 0), radius=1, start_angle=0, end_angle=180))
+    euler.addEntity(Arc(center=(0, 0, 0), radius=1, start_angle=180, end_angle=360))
+    euler.addEntity(Line(start=(1, 0, 0), end=(3, 0, 0)))
+    entities = euler.reshapeEntities(euler.plan(workers=1))
+    arcs = sorted((e.start_angle, e.end_angle) for e in entities if e.dxftype == 'ARC')
+    assert arcs == [(0, 180), (180, 360)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sparse_and_dense_shortest_paths_agree(seed):
+    dense = random_euler(seed)
+    sparse = random_euler(seed)
+    sparse.denseLimit = 0
+    dense.plan(workers=1)
+    sparse.plan(workers=1)
+    assert added_length(sparse) == pytest.approx(added_length(dense))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_plan_does_not_depend_on_scale(seed):
+    # 放大 5000 倍后距离远超原来的 10000 上限, 加边长度按比例缩回后应相同
+    small = random_euler(seed)
+    large = random_euler(seed, scale=5000)
+    small.plan(workers=1)
+    large.plan(workers=1)
+    assert added_length(large)/5000 == pytest.approx(added_length(small))
+
+
+def has_ilp_solver():
+    try:
+        import cvxpy
+    except ImportError:
+        return False
+    return 'GLPK_MI' in cvxpy.installed_solvers()
+
+
+@pytest.mark.skipif(not has_ilp_solver(), reason='需要 cvxpy 和 GLPK_MI')
+@pytest.mark.parametrize('seed', range(8))
+def test_blossom_matches_ilp(seed):
+    euler = random_euler(seed, chords=6)
+    odd = [i for i in range(euler.pointCount) if euler.pointDegree[i] % 2 == 1]
+    c = euler.oddGraph(odd)
+    euler.matcher = 'ilp'
+    ilp = euler.match(c)
+    euler.matcher = 'blossom'
+    blossom = euler.match(c)
+    assert blossom[1] == pytest.approx(ilp[1])
+    # 配对是对称的, 每个奇点恰好出现一次
+    assert blossom[0] == {(j, i) for i, j in blossom[0]}
+    assert sorted(i for i, j in blossom[0]) == list(range(len(odd)))
+
+
+def tied_pairs_by_enumeration(euler):
+    """ 原来的做法: 对每一对度为 1 的点各求一次匹配, 取代价 (取整后) 最小的所有点对 """
+    single = [i for i in range(euler.pointCount) if euler.pointDegree[i] == 1]
+    cost = {}
+    for a in range(len(single)):
+        for b in range(a+1, len(single)):
+            se = (single[a], single[b])
+            odd = [i for i in range(euler.pointCount) if euler.pointDegree[i] % 2 == 1 and i not in se]
+            cost[se] = round(euler.getCost(odd))/2 if odd else 0
+    best = min(cost.values())
+    return sorted(se for se in cost if cost[se] == best)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_single_solve_start_end_is_a_tied_optimum(seed):
+    euler = random_euler(seed, tails=2 + seed % 5)
+    ties = tied_pairs_by_enumeration(euler)
+    assert euler.getStartEndIndex()[0] in ties
+    assert euler.getStartEndIndex(allTies=True) == ties
+
+
+def test_all_ties_on_a_symmetric_part():
+    # 3x3 的方格, 四个角上各挂一条同样长的尾巴, 六种起止点组合的代价都相同
+    points = {(x, y): (x, y, 0) for x in range(3) for y in range(3)}
+    euler = Euler()
+    for (x, y), p in points.items():
+        if x < 2:
+            euler.addEntity(Line(start=p, end=points[(x+1, y)]))
+        if y < 2:
+            euler.addEntity(Line(start=p, end=points[(x, y+1)]))
+    for x, y in ((0, 0), (2, 0), (0, 2), (2, 2)):
+        euler.addEntity(Line(start=points[(x, y)], end=(2*x-1, y, 0)))
+    ties = euler.getStartEndIndex(allTies=True)
+    assert ties == tied_pairs_by_enumeration(euler)
+    assert len(ties) == 6
+
+
+def test_plan_skips_isolated_vertices():
+    euler = Euler()
+    euler.addEdgeArrays([[0, 0], [1, 0], [5, 5]], [[0, 1]])
+    assert euler.plan(workers=1) == [(0, 1, 0)]
+    assert Euler().plan(workers=1) == []
+
+
+def test_mirrored_arc_joins_its_lines(tmp_path):
+    import ezdxf
+    from gridpath import saveDxf
+
+    # 法向为 (0, 0, -1) 的圆弧, WCS 端点为 (-7, 5) 和 (-5, 7), 由两条直线闭合
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    msp.add_arc((6, 6), math.sqrt(2), 315, 135, dxfattribs={'extrusion': (0, 0, -1)})
+    msp.add_line((-7, 5), (-5, 5))
+    msp.add_line((-5, 5), (-5, 7))
+    doc.saveas(tmp_path / 'mirrored.dxf')
+
+    euler = Euler()
+    euler.readDxf(str(tmp_path / 'mirrored.dxf'))
+    assert euler.pointCount == 3
+    assert sum(d % 2 for d in euler.pointDegree) == 0
+
+    # 写出后再读入, 圆弧仍在原位
+    saveDxf(euler.reshapeEntities(euler.plan(workers=1)), str(tmp_path / 'out.dxf'))
+    arc = ezdxf.readfile(tmp_path / 'out.dxf').modelspace().query('ARC')[0]
+    assert arc.start_point.isclose((-7, 5, 0))
+    assert arc.end_point.isclose((-5, 7, 0))
+
+
+def traversal_points(entities, start):
+    """ 按走向取每个图元的起止点, 曲线图元的方向可能与走向相反 """
+    points = [tuple(start)]
+    for e in entities:
+        s, t = e.start, e.end
+        if math.dist(points[-1], s) > math.dist(points[-1], t):
+            s, t = t, s
+        assert math.dist(points[-1], s) < 1e-9
+        points.append(tuple(t))
+    return points
+
+
+@pytest.mark.parametrize('curve', [
+    Arc(center=(0, 0, 0), radius=2, start_angle=0, end_angle=90),
+    Ellipse(center=(0, 0, 0), major_axis=(3, 0, 0), ratio=0.5, start_param=0, end_param=math.pi/2,
+            extrusion=(0, 0, -1)),
+])
+def test_doubled_curves_are_offset_like_lines(curve):
+    euler = Euler()
+    euler.addEntity(curve)
+    u, v = 0, 1
+    # 沿曲线去了又回来, 两个方向各记一次重边
+    euler.edgeDouble = collections.Counter({(u, v): 1, (v, u): 1})
+    entities = euler.reshapeEntities([(u, v, 0), (v, u, 0)])
+    curves = [e for e in entities if e.dxftype == curve.dxftype]
+    assert len(curves) == 2
+    if curve.dxftype == 'ARC':
+        assert sorted(e.radius for e in curves) == [1.5, 2.5]
+    else:
+        assert sorted(math.hypot(*e.major_axis) for e in curves) == [2.5, 3.5]
+        assert sorted(math.hypot(*e.minor_axis) for e in curves) == pytest.approx([1, 2])
+    # 接回原来的端点, 整条路径连续且回到起点
+    points = traversal_points(entities, euler.points[u])
+    assert math.dist(points[-1], euler.points[u]) < 1e-9
+
+
+def two_stars():
+    """ 两个互不相连的三叉星, 各有四个奇点 """
+    euler = Euler()
+    for cx in (0, 5):
+        for end in ((cx+1, 0, 0), (cx-1, 0, 0), (cx, 1, 0)):
+            euler.addEntity(Line(start=(cx, 0, 0), end=end))
+    return euler
+
+
+def test_metrics_events_of_a_single_component():
+    euler = random_euler(3)
+    events = []
+    euler.metrics = events.append
+    euler.plan(workers=1)
+    assert [e['stage'] for e in events] == ['weightGraph', 'shortestPaths', 'startEnd', 'addEdge', 'eulerPath',
+                                            'bestPath', 'plan']
+    assert all(e['event'] == 'stage' for e in events)
+    stages = {e['stage']: e for e in events}
+    # 起止点和奇点配对只求解一次
+    assert stages['startEnd']['solverCalls'] == 1
+    assert stages['plan']['solverCalls'] == 1
+    assert stages['addEdge']['addedEdges'] == stages['plan']['addedEdges'] == euler.addedEdges() > 0
+    assert stages['plan']['components'] == 1
+    assert all('component' not in e for e in events)
+
+
+def test_metrics_events_are_tagged_with_their_component():
+    euler = two_stars()
+    events = []
+    euler.metrics = events.append
+    euler.plan(workers=1)
+    inner = events[:-1]
+    assert [e.get('component') for e in inner] == [0]*6 + [1]*6
+    assert [e['stage'] for e in inner[:6]] == [e['stage'] for e in inner[6:]]
+    assert all(e['solverCalls'] == 1 for e in inner if e['stage'] == 'startEnd')
+    assert events[-1]['stage'] == 'plan' and events[-1]['components'] == 2
+    assert events[-1]['addedEdges'] == euler.addedEdges() == 2
+
+
+def test_metrics_memory_field_follows_tracemalloc():
+    import tracemalloc
+
+    euler = random_euler(3)
+    events = []
+    euler.metrics = events.append
+    tracemalloc.start()
+    try:
+        euler.plan(workers=1)
+    finally:
+        tracemalloc.stop()
+    assert all('peakMemory' in e and 'processPeakMemory' not in e for e in events)
+    assert events[-1]['peakMemory'] >= max(e['peakMemory'] for e in events[:-1])
+
+
+class NoStageInfo(list):
+    def append(self, item):
+        raise AssertionError('metrics is None but a stage was instrumented')
+
+
+def test_no_metrics_no_instrumentation(monkeypatch):
+    import gridpath
+
+    def fail(*args):
+        raise AssertionError('metrics is None but a stage was instrumented')
+
+    monkeypatch.setattr(gridpath.tracemalloc, 'is_tracing', fail)
+    monkeypatch.setattr(gridpath, 'processPeakMemory', fail)
+    euler = two_stars()
+    euler.stageInfo = NoStageInfo()
+    assert euler.metrics is None
+    path = euler.plan(workers=1)
+    assert len(path) == euler.edgeCount + euler.addedEdges()
+    euler = random_euler(3)
+    euler.stageInfo = NoStageInfo()
+    euler.reshapeEntities(euler.plan(workers=1))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+from fixedpoint import quantize
+from hexlattice import hex_lattice_graph, hex_polygon_graph
+
+
+def edge_set(vertices, edges):
+    q = quantize(vertices)
+    return {frozenset((tuple(q[i]), tuple(q[j]))) for i, j in edges.tolist()}
+
+
+def brute_force_edges(polygon, hex_size):
+    """ 逐个格子与 polygon 求交, 取所有环上相邻两点连成的边, 与格子的排列方式相同 """
+    minx, miny, maxx, maxy = polygon.bounds
+    angles = np.radians(np.arange(0, 360, 60))
+    edges = set()
+    for k in range(-1, int(np.ceil((maxx - minx) / (1.5 * hex_size))) + 2):
+        for m in range(-1, int(np.ceil((maxy - miny) / (np.sqrt(3) * hex_size))) + 2):
+            x = minx + 1.5 * hex_size * k
+            y = miny + np.sqrt(3) * hex_size * (m + (k % 2) / 2)
+            cell = Polygon(zip(x + hex_size * np.cos(angles), y + hex_size * np.sin(angles)))
+            clipped = polygon.intersection(cell)
+            for part in shapely.get_parts(clipped):
+                if not isinstance(part, Polygon):
+                    continue
+                for ring in shapely.get_rings(part):
+                    q = quantize(shapely.get_coordinates(ring))
+                    for a, b in zip(q[:-1], q[1:]):
+                        if tuple(a) != tuple(b):
+                            edges.add(frozenset((tuple(a), tuple(b))))
+    return edges
+
+
+@pytest.mark.parametrize('bounds, hex_size', [
+    ((0, 0, 10, 10), 1),
+    ((2.5, -1, 9.3, 4.7), 0.8),
+    ((0, 0, 3, 2 * np.sqrt(3)), 1), # 边界恰好经过格点
+    ((0, 0, 5, 5), 1), # 右边经过格点, 格点向外有斜边
+    ((0, 0, 8, 8), 1),
+])
+def test_lattice_graph_matches_per_cell_intersection(bounds, hex_size):
+    vertices, edges = hex_lattice_graph(bounds, hex_size)
+    assert len(edges) == len(edge_set(vertices, edges))
+    length = np.hypot(*(vertices[edges[:, 0]] - vertices[edges[:, 1]]).T)
+    assert length.min() > 1e-6 * hex_size
+    assert edge_set(vertices, edges) == brute_force_edges(box(*bounds), hex_size)
+
+
+def test_polygon_graph_on_a_rectangle_matches_lattice_graph():
+    bounds = (1, 2, 8.5, 7.25)
+    assert edge_set(*hex_polygon_graph(box(*bounds), 0.7)) == edge_set(*hex_lattice_graph(bounds, 0.7))
+
+
+def test_polygon_graph_with_hole_matches_per_cell_intersection():
+    outline = [(0, 0), (12, 0), (12, 5), (6, 9), (0, 5)]
+    hole = [(3, 2), (8, 2.5), (5, 5)]
+    polygon = Polygon(outline, [hole])
+    vertices, edges = hex_polygon_graph(polygon, 1)
+    assert len(edges) == len(edge_set(vertices, edges))
+    assert edge_set(vertices, edges) == brute_force_edges(polygon, 1)
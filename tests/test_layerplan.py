@@ -0,0 +1,48 @@
+import os
+import time
+
+import layerplan
+from pointcloud import PointCloud
+
+
+def write_cloud(path, points):
+    with open(path, 'w') as f:
+        f.writelines('%g,%g,%g\n' % p for p in points)
+
+
+def test_layer_with_only_isolated_points(tmp_path):
+    # 底层为 3x3 的方块, 顶层只有一个尖点, 没有边
+    cloud = str(tmp_path / 'tip.txt')
+    write_cloud(cloud, [(i, j, 0) for i in range(3) for j in range(3)] + [(1, 1, 1)])
+    z, vertices, edges = list(PointCloud(cloud).occupancy().layerGraphs())[1]
+    assert vertices.shape == (0, 3) and edges.shape == (0, 2)
+    assert layerplan.planLayer((z, vertices, edges)) == (1, [])
+
+    # 尖点所在的层不影响其余层的输出
+    out = tmp_path / 'out'
+    assert layerplan.main([cloud, '-o', str(out), '-j', '1']) == 0
+    assert sorted(os.listdir(out)) == ['tip_layer000.dxf', 'tip_layer001.dxf']
+
+
+def square_layer(z):
+    vertices = [(0, 0, z), (1, 0, z), (1, 1, z), (0, 1, z)]
+    return z, vertices, [(0, 1), (1, 2), (2, 3), (3, 0)]
+
+
+def test_finished_layers_are_yielded_before_inflight_fills():
+    received = []
+    seen = []
+
+    def layers():
+        yield square_layer(0)
+        # 给第 0 层留出完成的时间
+        time.sleep(2)
+        yield square_layer(1)
+        # 取第 2 层时, 第 0 层应已交给调用方
+        seen.append(list(received))
+        yield square_layer(2)
+
+    for z, entities in layerplan.planLayers(layers(), workers=2, inflight=8):
+        received.append(z)
+    assert received == [0, 1, 2]
+    assert seen == [[0]]
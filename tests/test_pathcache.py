@@ -0,0 +1,96 @@
+import os
+import random
+
+import pytest
+
+from gridpath import Arc, Euler, Line
+from pathcache import PathCache
+
+
+def part(seed, jitter=0.0, shuffle=False):
+    """ 宽度随 seed 变化、带圆弧和尾巴的小零件
+    jitter 为直线端点的随机扰动 (远小于容差), shuffle 打乱图元顺序 """
+    rnd = random.Random(seed)
+    w = 3 + seed
+
+    def p(x, y):
+        return (x + rnd.uniform(-jitter, jitter), y + rnd.uniform(-jitter, jitter), 0)
+
+    entities = [Line(start=p(0, 0), end=p(w, 0)), Line(start=p(w, 0), end=p(w, 3)),
+                Line(start=p(w, 3), end=p(0, 3)), Line(start=p(0, 3), end=p(0, 0)),
+                Line(start=p(0, 0), end=p(w, 3)), Line(start=p(w, 0), end=p(w + 2, 0)),
+                Line(start=p(0, 3), end=p(-1, 5)), Line(start=p(0, 0), end=p(-1, -1)),
+                Arc(center=(w, 1.5, 0), radius=1.5, start_angle=270, end_angle=90)]
+    if shuffle:
+        rnd.shuffle(entities)
+    euler = Euler()
+    for e in entities:
+        euler.addEntity(e)
+    return euler
+
+
+def check_path(euler, path):
+    """ 路径首尾相接, 每条边的编号与端点一致, 原有的边都走到, 重边按 edgeDouble 多走 """
+    for (u, v, k), (x, y, l) in zip(path, path[1:]):
+        assert v == x
+    for u, v, k in path:
+        assert sorted(euler.edgeEnds[k].tolist()) == sorted((u, v))
+    assert {k for u, v, k in path} == set(range(euler.edgeCount))
+    assert len(path) == euler.edgeCount + euler.addedEdges()
+
+
+def test_hit_with_shuffled_and_jittered_entities(tmp_path, monkeypatch):
+    cache = PathCache(str(tmp_path))
+    first = part(1)
+    path, entities = cache.plan(first, workers=1)
+
+    second = part(1, jitter=0.01, shuffle=True)
+    # 命中时不再规划
+    monkeypatch.setattr(Euler, 'plan', lambda self, workers=None: pytest.fail('cache miss'))
+    hit, hitEntities = cache.plan(second, workers=1)
+    check_path(second, hit)
+    assert second.addedEdges() == first.addedEdges()
+    assert tuple(second.pointList[hit[0][0]]) == pytest.approx(tuple(first.pointList[path[0][0]]), abs=0.02)
+    assert len(hitEntities) == len(entities)
+
+
+@pytest.mark.parametrize('change', [{'delta': 2}, {'matcher': 'ilp'}, {'tolerance': 0.05}])
+def test_miss_when_parameters_change(tmp_path, change):
+    cache = PathCache(str(tmp_path))
+    cache.plan(part(1), workers=1)
+    euler = part(1)
+    assert cache.get(euler) is not None
+    for name, value in change.items():
+        setattr(euler, name, value)
+    assert cache.get(euler) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PathCache(str(tmp_path))
+    keys = []
+    for seed, mtime in ((1, 100), (2, 200), (4, 300)):
+        euler = part(seed)
+        cache.plan(euler, workers=1)
+        keys.append(cache.key(euler))
+        os.utime(cache.filename(keys[-1]), (mtime, mtime))
+    assert len(set(keys)) == 3
+    # 读取最旧的条目后它变为最近使用, 超出上限时先删第二旧的
+    assert cache.get(part(1)) is not None
+    sizes = [os.path.getsize(cache.filename(k)) for k in keys]
+    cache.maxBytes = sum(sizes) - 1
+    cache.evict()
+    assert [os.path.exists(cache.filename(k)) for k in keys] == [True, False, True]
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = PathCache(str(tmp_path))
+    euler = part(1)
+    cache.plan(euler, workers=1)
+    with open(cache.filename(cache.key(euler)), 'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get(part(1)) is None
+    # 重新规划后覆盖坏条目
+    euler = part(1)
+    path, entities = cache.plan(euler, workers=1)
+    check_path(euler, path)
+    assert cache.get(part(1)) is not None
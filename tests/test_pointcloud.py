@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from pointcloud import PointCloud
+
+
+def write_cloud(path, points):
+    with open(path, 'w') as f:
+        f.writelines('%r,%r,%r\n' % tuple(p) for p in np.asarray(points).tolist())
+
+
+def random_cloud(seed, n=200):
+    rng = np.random.default_rng(seed)
+    xy = rng.integers(0, 6, size=(n, 2)).astype(float)
+    z = rng.choice([0.0, 0.2, 0.4, 1.0], size=n)
+    return np.column_stack((xy, z))
+
+
+def test_layers_are_views_matching_the_text(tmp_path):
+    filename = str(tmp_path / 'cloud.txt')
+    points = random_cloud(0)
+    write_cloud(filename, points)
+    cloud = PointCloud(filename)
+    assert isinstance(cloud.points, np.memmap)
+    assert cloud.layers['z'].tolist() == [0.0, 0.2, 0.4, 1.0]
+    for k, z in enumerate(cloud.layers['z']):
+        layer = cloud.layer(k)
+        assert np.shares_memory(layer, cloud.points)
+        # 同一层内保持文件中的顺序
+        assert np.array_equal(layer, points[points[:, 2] == z])
+        assert np.array_equal(cloud.layerAt(z + 0.001), layer)
+    assert cloud.layerAt(0.6).shape == (0, 3)
+    assert cloud.layerAt(-1).shape == (0, 3)
+    assert cloud.layerAt(5).shape == (0, 3)
+
+
+def test_sidecar_is_rebuilt_only_when_the_text_is_newer(tmp_path):
+    filename = str(tmp_path / 'cloud.txt')
+    old, new = random_cloud(0), random_cloud(1)
+    write_cloud(filename, old)
+    cloud = PointCloud(filename)
+    built = os.stat(cloud.pointsFile()).st_mtime_ns
+    del cloud
+
+    # 文本比旁路文件旧: 直接用旁路文件, 不重新解析
+    write_cloud(filename, new)
+    os.utime(filename, ns=(built - 10**9, built - 10**9))
+    assert np.array_equal(PointCloud(filename).layer(0), old[old[:, 2] == 0])
+
+    # 文本更新后重建
+    os.utime(filename, ns=(built + 10**9, built + 10**9))
+    assert np.array_equal(PointCloud(filename).layer(0), new[new[:, 2] == 0])
+
+
+def brute_force_graph(points, pitch, diagonal):
+    """ 两两比较格点下标, 相差一格 (四邻域) 或在对角上 (八邻域) 的点连边, 孤立点不算 """
+    ij = {tuple(np.rint(p[:2] / pitch).astype(int)) for p in points}
+    edges = set()
+    for a in ij:
+        for b in ij:
+            d = (abs(a[0] - b[0]), abs(a[1] - b[1]))
+            if a < b and (d in ((0, 1), (1, 0)) or (diagonal and d == (1, 1))):
+                edges.add(frozenset((a, b)))
+    return edges
+
+
+@pytest.mark.parametrize('diagonal', [False, True])
+def test_layer_graph_matches_brute_force(tmp_path, diagonal):
+    filename = str(tmp_path / 'cloud.txt')
+    points = random_cloud(2, n=80)
+    points[:, :2] *= 0.5
+    write_cloud(filename, points)
+    occupancy = PointCloud(filename).occupancy(pitch=0.5)
+    origin = points[:, :2].min(axis=0)
+    for k, (z, vertices, edges) in enumerate(occupancy.layerGraphs(diagonal)):
+        layer = points[points[:, 2] == z]
+        ij = [tuple(v) for v in np.rint((vertices[:, :2] - origin) / 0.5).astype(int).tolist()]
+        assert len(set(ij)) == len(ij)
+        assert np.all(vertices[:, 2] == z)
+        found = {frozenset((ij[i], ij[j])) for i, j in edges.tolist()}
+        assert len(found) == len(edges)
+        assert found == brute_force_graph(layer[:, :2] - origin, 0.5, diagonal)
+        # 只输出有邻居的点
+        assert set(ij) == set().union(*found)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+from programming import generate_hex_grid
+
+
+def generate_hex_grid_per_cell(rect, hex_size):
+    """ 向量化以前的写法: 逐个格子构造六边形并与矩形求交 """
+    minx, miny, maxx, maxy = rect.bounds
+    dx = 3 / 2 * hex_size
+    dy = np.sqrt(3) * hex_size
+    hexagons = []
+    for x in np.arange(minx - hex_size, maxx + hex_size, dx):
+        for y in np.arange(miny - hex_size, maxy + hex_size, dy):
+            y_offset = y if int(x / dx) % 2 == 0 else y + dy / 2
+            hexagon = Polygon([(x + hex_size * np.cos(np.radians(angle)), y_offset + hex_size * np.sin(np.radians(angle)))
+                               for angle in range(0, 360, 60)])
+            intersection = rect.intersection(hexagon)
+            if intersection.is_valid:
+                hexagons.append(intersection)
+    return hexagons
+
+
+@pytest.mark.parametrize('bounds, hex_size', [((0, 0, 10, 10), 1), ((-3, 1.5, 7.2, 6), 0.6)])
+def test_hex_grid_matches_per_cell_intersection(bounds, hex_size):
+    rect = box(*bounds)
+    expected = generate_hex_grid_per_cell(rect, hex_size)
+    hexagons = generate_hex_grid(rect, hex_size)
+    assert len(hexagons) == len(expected)
+    # 格子的顺序、每个格子顶点的起点和方向都与逐格求交相同
+    for a, b in zip(hexagons, expected):
+        assert a.geom_type == b.geom_type
+        assert np.array_equal(shapely.get_coordinates(a), shapely.get_coordinates(b))